@@ -3,22 +3,80 @@ import sys
 import json
 import os
 import warnings
+import mmap
+import struct
+import argparse
+import time
+import bisect
+import threading
+import traceback
+import logging
+import logging.handlers
+from collections import Counter, OrderedDict, deque
 from PyQt6.QtWidgets import (QApplication, QWidget, QSystemTrayIcon, QMenu, QDialog,
                              QVBoxLayout, QFormLayout, QPushButton, QSpinBox,
                              QFontComboBox, QColorDialog, QHBoxLayout, QMessageBox,
                              QMainWindow, QTextEdit, QLabel, QCheckBox, QGridLayout,
-                             QSlider, QStatusBar, QComboBox, QLineEdit, QInputDialog)
-from PyQt6.QtCore import Qt, QPoint, QPointF, QObject, pyqtSignal, QRect
+                             QSlider, QStatusBar, QComboBox, QLineEdit, QInputDialog,
+                             QScrollArea, QListWidget, QListWidgetItem)
+from PyQt6.QtCore import (Qt, QPoint, QPointF, QObject, pyqtSignal, QRect, QTimer,
+                          QRunnable, QThreadPool, QEvent)
 from PyQt6.QtGui import (QPainter, QColor, QFont, QPainterPath, QPen, QIcon,
-                         QPixmap, QAction, QTextCursor, QFontMetrics)
+                         QPixmap, QAction, QTextCursor, QFontMetrics, QImage, QMouseEvent,
+                         QRegion)
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket, QTcpServer, QHostAddress
+try:
+    import numpy as np  # нужен только для быстрой калибровки
+except ImportError:
+    np = None
 
 # --- КОНСТАНТЫ ---
 APP_NAME = "NardiLens"
 APP_VERSION = "1.5"
 CONFIG_FILE = "config.json"
+# Журнал правок точек: дописывается при каждом перемещении, сливается в config.json по завершении
+EDIT_JOURNAL_FILE = "config.journal"
 ICON_FILE = "icon.png"
 # Нумерация теперь жестко задана в коде и не зависит от конфига
 NUMBER_MAPPING = {str(i): i for i in range(1, 25)}
+# Длительность кадра (~60 Гц): частые обновления склеиваются до одного за кадр
+FRAME_MS = 16
+# Предпросмотр перерисовывается не чаще одного раза за кадр
+PREVIEW_FRAME_MS = FRAME_MS
+PREVIEW_MARGIN = 40
+# Локальный канал для единственного экземпляра и внешних аннотаций
+INSTANCE_SERVER_NAME = f"{APP_NAME}-instance"
+IPC_CONNECT_TIMEOUT_MS = 200
+IPC_MAX_BUFFER = 1024 * 1024
+# Трансляция состояния оверлея зрителям (порт 0 — выключено)
+SPECTATOR_MAX_QUEUED_BYTES = 256 * 1024
+# Трассировка задержки «ввод -> отрисовка» в режиме настройки
+LATENCY_BUCKETS_MS = [1, 2, 4, 8, 16, 33, 50, 100, 250]
+TRACE_MAX_EVENTS = 200000
+# Сторож зависаний GUI-потока
+STALL_LOG_FILE = "stalls.log"
+STALL_THRESHOLD_MS = 300
+STALL_HEARTBEAT_MS = 100
+STALL_SAMPLE_MS = 50
+STALL_REPORTS_KEPT = 50
+# Пауза без расхода процессора — сон системы, а не зависание
+STALL_SUSPEND_CPU_SHARE = 0.2
+# Общий кэш готовых изображений номеров для всех досок
+LABEL_CACHE_SIZE = 512
+# Редактирование точек перетаскиванием
+EDIT_GRID_CELL = 64
+EDIT_HIT_RADIUS = 32
+# Быстрая калибровка: пункты-якоря по порядку и модель доски
+FIT_ANCHOR_ORDER = [1, 12, 13, 24]
+FIT_BAR_UNITS = 2.0           # ширина бара сверх обычного шага, в шагах между пунктами
+FIT_BAR_SEARCH = (0.0, 4.0, 81)
+FIT_HOMOGRAPHY_MIN_ANCHORS = 6
+FIT_OUTLIER_SPACING = 0.6    # выброс — якорь дальше этой доли шага от подогнанной точки
+# Пересчет раскладок при смене мониторов, разрешения или масштаба
+SCREEN_CHANGE_DEBOUNCE_MS = 200
+# Запись сессии: кольцевой файл записей фиксированного размера, отображенный в память
+SESSION_RECORD_FILE = "session.rec"
+SESSION_RECORD_CAPACITY = 65536   # 65536 * 128 байт = 8 МБ на диске
 
 # --- СТРУКТУРА КОНФИГУРАЦИИ ПО УМОЛЧАНИЮ ---
 def get_default_profile():
@@ -40,7 +98,12 @@ DEFAULT_CONFIG = {
     },
     "active_profile_name": "Default",
     "main_window_geometry": [], # x, y, width, height
-    "show_overlay_on_startup": True
+    "show_overlay_on_startup": True,
+    "session_profiles": [], # профили, которые рисуются одновременно с активным (мультистол)
+    "session_recorder": True,
+    "spectator_host": "127.0.0.1",
+    "spectator_port": 0,
+    "spectator_allow_origin": "" # Origin, которому браузер разрешит читать поток SSE (пусто — никому)
 }
 
 # --- Вспомогательные функции ---
@@ -52,6 +115,72 @@ def get_total_screens_geometry():
         total_rect = total_rect.united(screen.geometry())
     return total_rect
 
+def local_point(origin, x, y):
+    """Глобальная точка в координатах окна без рамки с левым верхним углом origin.
+
+    Заменяет mapFromGlobal: начало окна берется один раз на всю отрисовку.
+    """
+    return QPoint(x - origin.x(), y - origin.y())
+
+def describe_screens():
+    """Текущие экраны: имя, производитель, серийный номер, геометрия в логических пикселях и масштаб."""
+    return [{"name": screen.name(), "manufacturer": screen.manufacturer(), "serial": screen.serialNumber(),
+             "geometry": list(screen.geometry().getRect()), "dpr": screen.devicePixelRatio()}
+            for screen in QApplication.screens()]
+
+def normalize_coordinates(coordinates, screens):
+    """Переводит глобальные точки в доли экрана, на котором они лежат.
+
+    Возвращает {"screens": [...], "points": [[номер экрана, nx, ny], ...]} или None,
+    если какая-то точка не попадает ни на один экран.
+    """
+    points = []
+    for x, y in coordinates:
+        for index, screen in enumerate(screens):
+            sx, sy, sw, sh = screen["geometry"]
+            if sx <= x < sx + sw and sy <= y < sy + sh:
+                points.append([index, (x - sx) / sw, (y - sy) / sh])
+                break
+        else:
+            return None
+    return {"screens": screens, "points": points}
+
+def build_screen_transforms(source_screens, current_screens):
+    """Для каждого исходного экрана — (x, y, ширина, высота) экрана, на который он переезжает.
+
+    Экран ищется по имени, производителю и серийному номеру, затем только по имени
+    (одинаковые мониторы сопоставляются по порядку), затем по порядковому номеру,
+    иначе берется первый.
+    """
+    def full_key(screen): return (screen["name"], screen.get("manufacturer", ""), screen.get("serial", ""))
+    def name_key(screen): return screen["name"]
+    targets = [None] * len(source_screens)
+    free = list(range(len(current_screens)))
+    for key in (full_key, name_key):
+        for index, source in enumerate(source_screens):
+            if targets[index] is not None: continue
+            match = next((i for i in free if key(current_screens[i]) == key(source)), None)
+            if match is not None:
+                targets[index] = current_screens[match]
+                free.remove(match)
+    transforms = []
+    for index, source in enumerate(source_screens):
+        target = targets[index]
+        if target is None:
+            target = current_screens[index] if index < len(current_screens) else current_screens[0]
+            print(f"Экран {source['name']} не найден, его точки перенесены на экран {target['name']}.")
+        transforms.append(tuple(target["geometry"]))
+    return transforms
+
+def remap_coordinates(normalized, current_screens):
+    """Восстанавливает глобальные координаты из долей экрана для текущей конфигурации экранов."""
+    transforms = build_screen_transforms(normalized["screens"], current_screens)
+    coordinates = []
+    for index, nx, ny in normalized["points"]:
+        sx, sy, sw, sh = transforms[index]
+        coordinates.append([int(round(sx + nx * sw)), int(round(sy + ny * sh))])
+    return coordinates
+
 def draw_number(painter, local_pos, text, font, font_color, outline_color, outline_width):
     """Универсальная функция для отрисовки текста с обводкой."""
     path = QPainterPath()
@@ -61,6 +190,10 @@ def draw_number(painter, local_pos, text, font, font_color, outline_color, outli
     adjusted_pos = QPointF(local_pos.x() - text_width / 2, local_pos.y() + text_height / 2)
 
     path.addText(adjusted_pos, font, text)
+    paint_outlined_path(painter, path, font_color, outline_color, outline_width)
+
+def paint_outlined_path(painter, path, font_color, outline_color, outline_width):
+    """Рисует контур текста обводкой, затем заливает его основным цветом."""
     painter.setPen(QPen(outline_color, outline_width, Qt.PenStyle.SolidLine, Qt.PenCapStyle.RoundCap, Qt.PenJoinStyle.RoundJoin))
     painter.setBrush(Qt.BrushStyle.NoBrush)
     painter.drawPath(path)
@@ -68,6 +201,22 @@ def draw_number(painter, local_pos, text, font, font_color, outline_color, outli
     painter.setBrush(font_color)
     painter.drawPath(path)
 
+def get_preview_layout(coordinates):
+    """Переводит координаты профиля в локальные точки предпросмотра в реальном масштабе."""
+    if not coordinates or len(coordinates) < len(NUMBER_MAPPING):
+        # Типовая доска: два ряда по 12 пунктов с планкой посередине
+        coordinates = []
+        for row_y in (0, 800):
+            for i in range(12):
+                coordinates.append([i * 60 + (120 if i >= 6 else 0), row_y])
+    min_x = min(x for x, _ in coordinates)
+    min_y = min(y for _, y in coordinates)
+    max_x = max(x for x, _ in coordinates)
+    max_y = max(y for _, y in coordinates)
+    points = [(x - min_x + PREVIEW_MARGIN, y - min_y + PREVIEW_MARGIN) for x, y in coordinates]
+    size = (max_x - min_x + 2 * PREVIEW_MARGIN, max_y - min_y + 2 * PREVIEW_MARGIN)
+    return points, size
+
 def get_tray_icon():
     """Загружает иконку из файла icon.png или создает ее, если файл не найден."""
     if os.path.exists(ICON_FILE):
@@ -86,6 +235,136 @@ def get_tray_icon():
     painter.end()
     return QIcon(pixmap)
 
+# --- Подгонка раскладки доски по нескольким якорям ---
+def board_canonical_points(bar_units):
+    """Координаты 24 пунктов в системе доски для каждого варианта ширины бара: (K, 24, 2).
+
+    Пункты 1-12 — верхний ряд, 13-24 — нижний, оба слева направо, как при
+    обычной расстановке; между 6-м и 7-м столбцом — бар.
+    """
+    bars = np.atleast_1d(np.asarray(bar_units, dtype=float))
+    columns = np.tile(np.arange(12), 2)
+    u = columns[None, :] + bars[:, None] * (columns >= 6)[None, :]
+    v = np.broadcast_to(np.repeat([0.0, 1.0], 12)[None, :], u.shape)
+    return np.stack([u, v], axis=-1)
+
+def _fit_affine(canon, screen):
+    """МНК-аффинное преобразование для всей пачки вариантов сразу: canon (K, n, 2) -> screen (n, 2)."""
+    design = np.concatenate([canon, np.ones(canon.shape[:2] + (1,))], axis=-1)
+    normal = np.einsum('kni,knj->kij', design, design)
+    rhs = np.einsum('kni,nj->kij', design, screen)
+    params = np.linalg.solve(normal + 1e-9 * np.eye(3), rhs)
+    return lambda points: np.concatenate([points, np.ones(points.shape[:2] + (1,))], axis=-1) @ params
+
+def _fit_homography(canon, screen):
+    """Нормализованный DLT для пачки вариантов; решение — последний сингулярный вектор."""
+    mean, scale = screen.mean(axis=0), np.sqrt(2) / max(np.linalg.norm(screen - screen.mean(axis=0), axis=1).mean(), 1e-9)
+    x, y = ((screen - mean) * scale).T
+    u, v = canon[..., 0], canon[..., 1]
+    ones, zeros = np.ones_like(u), np.zeros_like(u)
+    rows_x = np.stack([u, v, ones, zeros, zeros, zeros, -x * u, -x * v, -x * ones], axis=-1)
+    rows_y = np.stack([zeros, zeros, zeros, u, v, ones, -y * u, -y * v, -y * ones], axis=-1)
+    _, _, vt = np.linalg.svd(np.concatenate([rows_x, rows_y], axis=1))
+    h = vt[:, -1, :].reshape(-1, 3, 3)
+    def project(points):
+        projected = np.concatenate([points, np.ones(points.shape[:2] + (1,))], axis=-1) @ h.transpose(0, 2, 1)
+        return projected[..., :2] / projected[..., 2:3] / scale + mean
+    return project
+
+def _solve_board(indices, screen, bars, model=None):
+    """Подгоняет модель под якоря для всех вариантов бара; возвращает лучший вариант.
+
+    Варианты с бесконечными или NaN точками (вырожденные якоря) отбрасываются;
+    если гомография вырождена для всех вариантов, берется аффинная модель.
+    Возвращает None, если конечного решения нет.
+    """
+    if model is None: model = "homography" if len(indices) >= FIT_HOMOGRAPHY_MIN_ANCHORS else "affine"
+    canon = board_canonical_points(bars)
+    project = (_fit_homography if model == "homography" else _fit_affine)(canon[:, indices], screen)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        points = project(canon)
+    finite = np.isfinite(points).all(axis=(1, 2))
+    if not finite.any():
+        return _solve_board(indices, screen, bars, "affine") if model == "homography" else None
+    errors = np.linalg.norm(points[:, indices] - screen[None], axis=-1)
+    best = int(np.argmin(np.where(finite, (errors ** 2).sum(axis=1), np.inf)))
+    return points[best], errors[best], float(bars[best]), model
+
+def _point_spacing(points):
+    """Медианный шаг между соседними пунктами ряда (без бара); для вырожденной доски — 0.
+
+    Берется меньший из двух рядов, а также расстояние между рядами, чтобы
+    схлопнувшийся нижний ряд не проходил проверку по верхнему.
+    """
+    steps = [np.median(np.linalg.norm(np.diff(row, axis=0), axis=1)[[0, 1, 2, 3, 4, 6, 7, 8, 9, 10]])
+             for row in (points[:12], points[12:])]
+    return min(steps + [np.linalg.norm(points[12:].mean(axis=0) - points[:12].mean(axis=0))])
+
+def _can_drop_anchor(indices, keep, j, model):
+    """Можно ли исключить якорь j: в каждом ряду остается хотя бы два якоря
+    в разных столбцах, а якорей хватает для модели без него."""
+    rest = indices[keep & (np.arange(len(indices)) != j)]
+    minimum = FIT_HOMOGRAPHY_MIN_ANCHORS if model == "homography" else 4
+    if len(rest) < minimum: return False
+    return all(len({i % 12 for i in rest if (i >= 12) == bottom}) >= 2 for bottom in (False, True))
+
+def fit_board_layout(anchors, bar_units=None):
+    """Восстанавливает все 24 пункта по якорям {номер пункта: (x, y)}.
+
+    До FIT_HOMOGRAPHY_MIN_ANCHORS якорей используется аффинная модель, дальше —
+    гомография. Если якоря покрывают хотя бы три столбца, ширина бара
+    подбирается перебором (все варианты решаются одной векторной операцией),
+    иначе берется FIT_BAR_UNITS. Выбросы ищутся жадно той же моделью, что и
+    итоговая подгонка: якорь, который хуже всех предсказывается подгонкой без
+    него, исключается, если промах больше FIT_OUTLIER_SPACING шага и без него
+    оба ряда остаются определены; итоговая раскладка подгоняется без выбросов.
+    Возвращает None, если якорей меньше трех или они вырождены (например,
+    несколько кликов в одну точку).
+    """
+    if np is None or len(anchors) < 3: return None
+    indices = np.array(sorted(anchors)) - 1
+    screen = np.array([anchors[i + 1] for i in indices], dtype=float)
+    columns = {i % 12 for i in indices}
+    if bar_units is None and len(columns) >= 3 and any(0 < c < 11 for c in columns):
+        bars = np.linspace(*FIT_BAR_SEARCH)
+    else:
+        bars = np.array([FIT_BAR_UNITS if bar_units is None else bar_units])
+    solution = _solve_board(indices, screen, bars)
+    if solution is None: return None
+    points, errors, bar, model = solution
+    spacing = _point_spacing(points)
+    if not spacing >= 1: return None
+    outliers, keep = [], np.ones(len(indices), dtype=bool)
+    while True:
+        misses, rest_errors = {}, {}
+        for j in np.flatnonzero(keep):
+            if not _can_drop_anchor(indices, keep, j, model): continue
+            keep[j] = False
+            loo = _solve_board(indices[keep], screen[keep], np.array([bar]), model)
+            keep[j] = True
+            if loo is None: continue
+            misses[j] = np.linalg.norm(loo[0][indices[j]] - screen[j])
+            rest_errors[j] = (loo[1] ** 2).sum()
+        if not misses: break
+        worst = min(rest_errors, key=rest_errors.get)
+        if misses[worst] <= FIT_OUTLIER_SPACING * spacing: break
+        keep[worst] = False
+        outliers.append(int(indices[worst]) + 1)
+    if outliers:
+        solution = _solve_board(indices[keep], screen[keep], bars)
+        if solution is None: return None
+        points, _, bar, model = solution
+        if not _point_spacing(points) >= 1: return None
+        errors = np.linalg.norm(points[indices] - screen, axis=-1)
+    return {
+        "points": [[int(round(x)), int(round(y))] for x, y in points],
+        "residuals": {int(i) + 1: float(e) for i, e in zip(indices, errors)},
+        "rms": float(np.sqrt((errors[keep] ** 2).mean())),
+        "outliers": outliers,
+        "model": model,
+        "bar_units": bar,
+    }
+
 # --- Классы для перенаправления вывода в GUI ---
 class Stream(QObject):
     """Перенаправляет вывод консоли (stdout, stderr) в QTextEdit."""
@@ -93,6 +372,729 @@ class Stream(QObject):
     def write(self, text): self.new_text.emit(str(text))
     def flush(self): pass
 
+# --- Локальный канал управления (IPC) ---
+def build_arg_parser(exit_on_error=True):
+    """Аргументы командной строки; те же команды принимает уже запущенный экземпляр."""
+    parser = argparse.ArgumentParser(prog=APP_NAME, exit_on_error=exit_on_error)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--show", action="store_true", help="показать оверлей")
+    group.add_argument("--hide", action="store_true", help="скрыть оверлей")
+    parser.add_argument("--profile", metavar="NAME", help="переключиться на профиль")
+    parser.add_argument("--reload", action="store_true", help="перечитать config.json")
+    parser.add_argument("--trace-input", metavar="FILE",
+                        help="записывать задержку ввода в режиме настройки в Chrome trace JSON")
+    return parser
+
+def forward_to_running_instance(argv):
+    """Передает командную строку запущенному экземпляру. Возвращает True, если он есть."""
+    socket = QLocalSocket()
+    socket.connectToServer(INSTANCE_SERVER_NAME)
+    if not socket.waitForConnected(IPC_CONNECT_TIMEOUT_MS):
+        return False
+    socket.write((json.dumps({"argv": argv}, ensure_ascii=False) + "\n").encode('utf-8'))
+    socket.waitForBytesWritten(IPC_CONNECT_TIMEOUT_MS)
+    socket.disconnectFromServer()
+    return True
+
+class InstanceServer(QObject):
+    """Принимает построчные JSON-сообщения от второго запуска и локальных утилит."""
+    command_received = pyqtSignal(list)
+    annotations_received = pyqtSignal(list, bool)
+    board_state_received = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+        self._buffers = {}
+
+    def listen(self):
+        # Файл сокета мог остаться после аварийного завершения
+        QLocalServer.removeServer(INSTANCE_SERVER_NAME)
+        if not self.server.listen(INSTANCE_SERVER_NAME):
+            print(f"Не удалось открыть локальный канал: {self.server.errorString()}")
+            return False
+        return True
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self._buffers[socket] = b""
+            socket.readyRead.connect(lambda s=socket: self._on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self._on_disconnected(s))
+
+    def _on_disconnected(self, socket):
+        if socket.bytesAvailable(): self._on_ready_read(socket)
+        # Последнее сообщение перед закрытием может прийти без перевода строки
+        rest = self._buffers.pop(socket, b"")
+        if rest.strip(): self._handle_message(rest)
+        socket.deleteLater()
+
+    def _on_ready_read(self, socket):
+        if socket not in self._buffers: return
+        data = self._buffers[socket] + bytes(socket.readAll())
+        *lines, rest = data.split(b"\n")
+        if len(rest) > IPC_MAX_BUFFER:
+            print("Локальный канал: слишком длинное сообщение, соединение закрыто.")
+            self._buffers.pop(socket, None)
+            socket.abort()
+            return
+        self._buffers[socket] = rest
+        for line in lines:
+            if line.strip():
+                self._handle_message(line)
+
+    def _handle_message(self, line):
+        try:
+            message = json.loads(line.decode('utf-8'))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            print("Локальный канал: получено некорректное сообщение.")
+            return
+        if not isinstance(message, dict): return
+        if isinstance(message.get("argv"), list):
+            self.command_received.emit([str(arg) for arg in message["argv"]])
+        annotations = message.get("annotations", [])
+        if annotations or message.get("clear"):
+            self.annotations_received.emit(annotations if isinstance(annotations, list) else [],
+                                           bool(message.get("clear")))
+        board = message.get("board")
+        if isinstance(board, list) and len(board) == len(NUMBER_MAPPING) and all(isinstance(n, int) for n in board):
+            self.board_state_received.emit(board)
+
+# --- Трансляция состояния зрителям ---
+def diff_state(old, new):
+    """Возвращает только изменившиеся поля состояния (для аннотаций — по пунктам) или None."""
+    changes = {}
+    for key, value in new.items():
+        if key == "annotations":
+            old_annotations = old.get("annotations", {})
+            delta = {point: a for point, a in value.items() if old_annotations.get(point) != a}
+            delta.update({point: None for point in old_annotations if point not in value})
+            if delta: changes[key] = delta
+        elif old.get(key) != value:
+            changes[key] = value
+    return changes or None
+
+def apply_state_delta(state, changes):
+    """Применяет дельту diff_state к состоянию на стороне зрителя."""
+    for key, value in changes.items():
+        if key == "annotations":
+            annotations = state.setdefault("annotations", {})
+            for point, annotation in value.items():
+                if annotation is None: annotations.pop(point, None)
+                else: annotations[point] = annotation
+        else:
+            state[key] = value
+    return state
+
+class SpectatorClient:
+    """Подключенный зритель: сокет, режим протокола и последнее отправленное ему состояние."""
+    def __init__(self, socket):
+        self.socket = socket
+        self.mode = None  # "lines" или "sse"
+        self.last_state = None
+        self.pending = False
+
+class StatePublisher(QObject):
+    """Отдает зрителям полный снимок при подключении, затем только дельты.
+
+    Зритель-клиент присылает любую строку (например, `{"subscribe": true}`),
+    браузер — обычный GET и получает поток Server-Sent Events. Если сообщение
+    не помещается в очередь отправки клиента (SPECTATOR_MAX_QUEUED_BYTES),
+    промежуточные состояния пропускаются и после ее опустошения уходит одна
+    дельта до самого свежего состояния.
+    """
+    def __init__(self, state_provider, parent=None, allow_origin=""):
+        super().__init__(parent)
+        self.state_provider = state_provider
+        self.allow_origin = allow_origin
+        self.version = 0
+        self.clients = {}
+        self._state = None
+        self.server = QTcpServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+        self._publish_timer = QTimer(self)
+        self._publish_timer.setSingleShot(True)
+        self._publish_timer.setInterval(FRAME_MS)
+        self._publish_timer.timeout.connect(self.publish)
+
+    def listen(self, host, port):
+        if not self.server.listen(QHostAddress(host), port):
+            print(f"Не удалось запустить трансляцию на {host}:{port}: {self.server.errorString()}")
+            return False
+        print(f"Трансляция состояния оверлея: {host}:{self.server.serverPort()}")
+        return True
+
+    def mark_dirty(self):
+        """Состояние изменилось: публикация склеивается до одной за кадр."""
+        if self.server.isListening() and not self._publish_timer.isActive():
+            self._publish_timer.start()
+
+    def publish(self):
+        state = self.state_provider()
+        if state == self._state: return
+        self._state = state
+        self.version += 1
+        for client in self.clients.values():
+            self._send_latest(client)
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            client = SpectatorClient(socket)
+            self.clients[socket] = client
+            socket.readyRead.connect(lambda c=client: self._on_ready_read(c))
+            socket.bytesWritten.connect(lambda _, c=client: self._on_bytes_written(c))
+            socket.disconnected.connect(lambda s=socket: self._on_disconnected(s))
+
+    def _on_disconnected(self, socket):
+        self.clients.pop(socket, None)
+        socket.deleteLater()
+
+    def _on_ready_read(self, client):
+        data = bytes(client.socket.readAll())
+        if client.mode is not None: return
+        if data.startswith(b"GET "):
+            client.mode = "sse"
+            headers = "HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+            if self.allow_origin:
+                headers += f"Access-Control-Allow-Origin: {self.allow_origin}\r\n"
+            client.socket.write((headers + "\r\n").encode('utf-8'))
+        else:
+            client.mode = "lines"
+        if self._state is None: self._state = self.state_provider()
+        self._send_latest(client)
+
+    def _on_bytes_written(self, client):
+        if client.pending and client.socket.bytesToWrite() < SPECTATOR_MAX_QUEUED_BYTES:
+            self._send_latest(client)
+
+    def _send_latest(self, client):
+        if client.mode is None: return
+        queued = client.socket.bytesToWrite()
+        if queued >= SPECTATOR_MAX_QUEUED_BYTES:
+            client.pending = True
+            return
+        if client.last_state is None:
+            message = {"type": "snapshot", "version": self.version, "state": self._state}
+        else:
+            changes = diff_state(client.last_state, self._state)
+            if changes is None:
+                client.pending = False
+                return
+            message = {"type": "delta", "version": self.version, "changes": changes}
+        payload = json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+        data = (f"data: {payload}\n\n" if client.mode == "sse" else payload + "\n").encode('utf-8')
+        # Пустая очередь принимает сообщение любого размера, иначе лимит не превышается
+        if queued and queued + len(data) > SPECTATOR_MAX_QUEUED_BYTES:
+            client.pending = True
+            return
+        client.pending = False
+        client.last_state = self._state
+        client.socket.write(data)
+
+# --- Трассировка задержки ввода ---
+class InputLatencyTracer:
+    """Связывает события мыши с отрисовкой, которая их показала.
+
+    Задержка считается от появления события до конца paintEvent, то есть
+    вместе с ожиданием в очереди за медленной отрисовкой. Для событий системы
+    время берется из event.timestamp(), совмещенного с perf_counter по
+    наименьшей наблюдавшейся задержке доставки; для воспроизведения — момент
+    postEvent, который InputReplayer регистрирует через post_input. В задержку
+    попадают только события, обработка которых запросила перерисовку
+    (note_update); остальные (наведение, пустой клик) отбрасываются в end_input.
+    Результат
+    сохраняется в формате Chrome trace (chrome://tracing, Perfetto); события
+    ввода в нем содержат координаты, поэтому файл можно воспроизвести снова.
+    """
+    def __init__(self):
+        self.origin_ns = time.perf_counter_ns()
+        self.events = []
+        self.latencies_ms = []
+        self.frame_intervals_ms = []
+        self._pending_inputs = []
+        self._current_inputs = []  # события в обработке, еще не запросившие перерисовку
+        self._paint_start_ns = None
+        self._last_paint_end_ns = None
+        self._next_id = 0
+        self._posted = deque()          # (ID, время postEvent) событий воспроизведения, по порядку
+        self._timestamp_offset_ns = None
+
+    def _us(self, ns):
+        return (ns - self.origin_ns) / 1000
+
+    def _add_event(self, event):
+        if len(self.events) < TRACE_MAX_EVENTS: self.events.append(event)
+
+    def post_input(self):
+        """Регистрирует событие, поставленное в очередь воспроизведением; возвращает его ID."""
+        self._next_id += 1
+        self._posted.append((self._next_id, time.perf_counter_ns()))
+        return self._next_id
+
+    def _input_stamp(self, event, now):
+        if self._posted and not event.spontaneous():
+            # Отложенные события доставляются в порядке postEvent
+            return self._posted.popleft()
+        self._next_id += 1
+        if not event.timestamp(): return self._next_id, now
+        event_ns = event.timestamp() * 1_000_000
+        if self._timestamp_offset_ns is None or now - event_ns < self._timestamp_offset_ns:
+            self._timestamp_offset_ns = now - event_ns
+        return self._next_id, event_ns + self._timestamp_offset_ns
+
+    def stamp_input(self, kind, event, button=None):
+        now = time.perf_counter_ns()
+        event_id, stamp = self._input_stamp(event, now)
+        global_pos = event.globalPosition().toPoint()
+        args = {"x": global_pos.x(), "y": global_pos.y(), "queued_ms": (now - stamp) / 1e6}
+        if button: args["button"] = button
+        self._add_event({"name": kind, "cat": "input", "ph": "i", "s": "t",
+                         "ts": self._us(stamp), "pid": 1, "tid": 1, "args": args})
+        self._current_inputs.append((event_id, stamp))
+
+    def note_update(self):
+        """Обработка текущего события запросила перерисовку — ее и ждем."""
+        for event_id, stamp in self._current_inputs:
+            self._add_event({"name": "input->paint", "cat": "latency", "ph": "s", "id": event_id,
+                             "ts": self._us(stamp), "pid": 1, "tid": 1})
+        self._pending_inputs.extend(self._current_inputs)
+        self._current_inputs.clear()
+
+    def end_input(self):
+        """Событие обработано без перерисовки: в задержку его не включаем."""
+        self._current_inputs.clear()
+
+    def begin_paint(self):
+        self._paint_start_ns = time.perf_counter_ns()
+
+    def end_paint(self):
+        if self._paint_start_ns is None: return
+        now = time.perf_counter_ns()
+        self._add_event({"name": "paint", "cat": "paint", "ph": "X", "ts": self._us(self._paint_start_ns),
+                         "dur": (now - self._paint_start_ns) / 1000, "pid": 1, "tid": 1,
+                         "args": {"inputs": len(self._pending_inputs)}})
+        for event_id, stamp in self._pending_inputs:
+            self.latencies_ms.append((now - stamp) / 1e6)
+            self._add_event({"name": "input->paint", "cat": "latency", "ph": "f", "bp": "e",
+                             "id": event_id, "ts": self._us(now), "pid": 1, "tid": 1})
+        self._pending_inputs.clear()
+        if self._last_paint_end_ns is not None:
+            self.frame_intervals_ms.append((now - self._last_paint_end_ns) / 1e6)
+        self._last_paint_end_ns = now
+        self._paint_start_ns = None
+
+    def histogram(self, values):
+        """Считает значения по корзинам LATENCY_BUCKETS_MS (последняя — все, что больше)."""
+        counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        for value in values:
+            counts[bisect.bisect_left(LATENCY_BUCKETS_MS, value)] += 1
+        return counts
+
+    def summary(self):
+        def percentile(values, q):
+            if not values: return 0.0
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        lines = [f"Задержка ввод->отрисовка: {len(self.latencies_ms)} событий, "
+                 f"p50 {percentile(self.latencies_ms, 0.5):.2f} мс, p95 {percentile(self.latencies_ms, 0.95):.2f} мс, "
+                 f"макс. {max(self.latencies_ms, default=0):.2f} мс"]
+        labels = [f"<={b} мс" for b in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]} мс"]
+        for label, count in zip(labels, self.histogram(self.latencies_ms)):
+            if count: lines.append(f"  {label:>9}: {count}")
+        if self.frame_intervals_ms:
+            mean = sum(self.frame_intervals_ms) / len(self.frame_intervals_ms)
+            lines.append(f"Интервал между кадрами: в среднем {mean:.2f} мс, "
+                         f"p95 {percentile(self.frame_intervals_ms, 0.95):.2f} мс")
+        return "\n".join(lines)
+
+    def dump(self, path):
+        data = {"traceEvents": self.events, "displayTimeUnit": "ms",
+                "otherData": {"app": f"{APP_NAME} v{APP_VERSION}",
+                              "latency_histogram_ms": dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ["inf"],
+                                                               self.histogram(self.latencies_ms))),
+                              "frame_interval_histogram_ms": dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ["inf"],
+                                                                      self.histogram(self.frame_intervals_ms)))}}
+        with open(path, 'w', encoding='utf-8') as f: json.dump(data, f)
+
+def load_input_recording(path):
+    """Читает запись ввода: список событий или Chrome trace, снятый InputLatencyTracer."""
+    with open(path, 'r', encoding='utf-8') as f: data = json.load(f)
+    if isinstance(data, list): return data
+    recording, origin = [], None
+    for event in data.get("traceEvents", []):
+        if event.get("cat") != "input": continue
+        if origin is None: origin = event["ts"]
+        recording.append({"t": (event["ts"] - origin) / 1000, "type": event["name"],
+                          "x": event["args"]["x"], "y": event["args"]["y"],
+                          "button": event["args"].get("button")})
+    return recording
+
+class InputReplayer(QObject):
+    """Подает записанные события мыши в виджет в реальном темпе или с максимальной скоростью.
+
+    Событие записи: {"t": мс от начала, "type": "move" | "press", "x", "y" (глобальные),
+    "button": "left" | "right"}.
+    """
+    finished = pyqtSignal()
+    BUTTONS = {"left": Qt.MouseButton.LeftButton, "right": Qt.MouseButton.RightButton}
+
+    def __init__(self, widget, recording, speed=1.0, parent=None):
+        super().__init__(parent)
+        self.widget = widget
+        self.recording = recording
+        self.speed = speed  # 0 — без пауз
+        self._index = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._post_next)
+
+    def start(self):
+        self._index = 0
+        self._started = time.perf_counter()
+        self._timer.start(0)
+
+    def _post_next(self):
+        if self._index >= len(self.recording):
+            self.finished.emit()
+            return
+        item = self.recording[self._index]
+        self._index += 1
+        global_pos = QPointF(item["x"], item["y"])
+        local_pos = QPointF(self.widget.mapFromGlobal(global_pos.toPoint()))
+        if item["type"] == "press":
+            button = self.BUTTONS.get(item.get("button"), Qt.MouseButton.LeftButton)
+            event = QMouseEvent(QEvent.Type.MouseButtonPress, local_pos, global_pos,
+                                button, button, Qt.KeyboardModifier.NoModifier)
+        else:
+            event = QMouseEvent(QEvent.Type.MouseMove, local_pos, global_pos, Qt.MouseButton.NoButton,
+                                Qt.MouseButton.NoButton, Qt.KeyboardModifier.NoModifier)
+        tracer = getattr(self.widget, "tracer", None)
+        if tracer: tracer.post_input()
+        QApplication.postEvent(self.widget, event)
+        if self._index >= len(self.recording) or self.speed <= 0:
+            self._timer.start(0)
+            return
+        due = self.recording[self._index]["t"] / 1000 / self.speed
+        self._timer.start(max(0, int((due - (time.perf_counter() - self._started)) * 1000)))
+
+# --- Сторож зависаний цикла событий ---
+class StallWatchdog(QObject):
+    """Следит за циклом событий Qt из отдельного потока.
+
+    GUI-поток раз в STALL_HEARTBEAT_MS отмечает «пульс». Если пульса нет дольше
+    порога, сторож снимает стек главного потока каждые STALL_SAMPLE_MS; когда
+    цикл оживает, отчет с длительностью и блокирующим кадром уходит в сигнал
+    и в ротируемый файл STALL_LOG_FILE.
+
+    Если главный поток держал GIL в C-коде (регулярное выражение, вставка
+    большого текста в QTextEdit), сторож не может ни проснуться, ни снять стек.
+    Такое зависание замечает сам GUI-поток по разрыву между «пульсами» и
+    записывает отчет без кадра. Разрыв почти без расхода процессора считается
+    сном системы.
+    """
+    stall_detected = pyqtSignal(dict)
+
+    def __init__(self, threshold_ms=STALL_THRESHOLD_MS, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.reports = deque(maxlen=STALL_REPORTS_KEPT)
+        self._main_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._last_beat_cpu = time.process_time()
+        self._sampling = None  # «пульс», от которого сторож сейчас снимает стек
+        self._stop = threading.Event()
+        self._thread = None
+        self._heartbeat = QTimer(self)
+        self._heartbeat.setInterval(STALL_HEARTBEAT_MS)
+        self._heartbeat.timeout.connect(self._beat)
+        self.stall_detected.connect(self.reports.append)
+        self.logger = logging.getLogger(f"{APP_NAME}.stalls")
+        self.logger.propagate = False
+        if not self.logger.handlers:
+            try:
+                handler = logging.handlers.RotatingFileHandler(STALL_LOG_FILE, maxBytes=256 * 1024,
+                                                               backupCount=3, encoding='utf-8')
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                self.logger.addHandler(handler)
+            except IOError as e: print(f"Не удалось открыть {STALL_LOG_FILE}: {e}")
+
+    def start(self):
+        """Вызывать из уже работающего цикла событий, иначе старт засчитается как зависание."""
+        self._last_beat = time.monotonic()
+        self._last_beat_cpu = time.process_time()
+        self._heartbeat.start()
+        self._thread = threading.Thread(target=self._watch, name="StallWatchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._heartbeat.stop()
+        self._stop.set()
+        if self._thread: self._thread.join(1)
+
+    def _beat(self):
+        now, cpu = time.monotonic(), time.process_time()
+        previous, gap = self._last_beat, now - self._last_beat
+        busy = cpu - self._last_beat_cpu >= STALL_SUSPEND_CPU_SHARE * gap
+        self._last_beat, self._last_beat_cpu = now, cpu
+        if gap > self.threshold and busy and self._sampling != previous:
+            # Сторож не получил GIL за все время зависания — стек недоступен
+            self._report(previous, now, "кадр недоступен (GIL занят главным потоком)", 0, "")
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._main_thread_id)
+        if frame is None: return None
+        summary = traceback.extract_stack(frame)
+        top = summary[-1]
+        return f"{top.name} ({os.path.basename(top.filename)}:{top.lineno})", summary
+
+    def _watch(self):
+        interval = STALL_SAMPLE_MS / 1000
+        last_wake, skip_beat = time.monotonic(), None
+        while not self._stop.wait(interval):
+            now = time.monotonic()
+            if now - last_wake > self.threshold:
+                # Сторож сам не работал дольше порога (сон системы или занятый GIL):
+                # стек этого разрыва уже не снять, его оценит GUI-поток в _beat
+                skip_beat = self._last_beat
+            last_wake = now
+            started = self._last_beat
+            if now - started < self.threshold or started == skip_beat: continue
+            samples, stacks = Counter(), {}
+            self._sampling = started
+            while not self._stop.is_set() and self._last_beat == started:
+                sample = self._sample()
+                if sample:
+                    samples[sample[0]] += 1
+                    stacks.setdefault(sample[0], sample[1])
+                self._stop.wait(interval)
+            if self._stop.is_set(): break
+            if samples:
+                blocking_frame = samples.most_common(1)[0][0]
+                self._report(started, time.monotonic(), blocking_frame, sum(samples.values()),
+                             "".join(traceback.format_list(stacks[blocking_frame])))
+            else:
+                self._report(started, time.monotonic(), "кадр недоступен", 0, "")
+
+    def _report(self, started, ended, blocking_frame, sample_count, stack):
+        report = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() - (time.monotonic() - started))),
+            "duration_ms": int((ended - started) * 1000),
+            "blocking_frame": blocking_frame,
+            "samples": sample_count,
+            "stack": stack,
+        }
+        self.logger.warning(f"Зависание {report['duration_ms']} мс в {blocking_frame}\n{stack}")
+        self.stall_detected.emit(report)
+
+# --- Запись и воспроизведение сессии ---
+class SessionRecorder:
+    """Пишет события оверлея в кольцевой файл записей фиксированного размера.
+
+    Файл отображен в память, поэтому запись события — это struct.pack_into без
+    системных вызовов, а размер на диске не превышает заголовок плюс
+    capacity записей. Счетчик в заголовке растет непрерывно; после заполнения
+    новые записи затирают самые старые.
+    """
+    MAGIC = b"NLREC1\0\0"
+    HEADER = struct.Struct("<8sIIIQd")       # магия, версия, размер записи, емкость, записано, начало
+    HEADER_SIZE = 64
+    RECORD = struct.Struct("<dBBhii")        # время, тип, флаги, пункт, x, y
+    RECORD_SIZE = 128
+    PAYLOAD_SIZE = RECORD_SIZE - RECORD.size
+    SESSION_START, PROFILE_SWITCH, VISIBILITY, CALIBRATION, POINT_EDIT, ANNOTATION, BOARD_STATE = range(7)
+    ANNOTATION_TEXT, ANNOTATION_COLOR, ANNOTATION_CLEAR = 1, 2, 4
+
+    def __init__(self, path=SESSION_RECORD_FILE, capacity=SESSION_RECORD_CAPACITY):
+        size = self.HEADER_SIZE + capacity * self.RECORD_SIZE
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        header = self._file.read(self.HEADER.size)
+        self._file.truncate(size)
+        self.mm = mmap.mmap(self._file.fileno(), size)
+        self.capacity = capacity
+        if len(header) == self.HEADER.size and self.HEADER.unpack(header)[:4] == (self.MAGIC, 1, self.RECORD_SIZE, capacity):
+            self.count = self.HEADER.unpack(header)[4]
+        else:
+            self.count = 0
+            self.HEADER.pack_into(self.mm, 0, self.MAGIC, 1, self.RECORD_SIZE, capacity, 0, time.time())
+        self._write(self.SESSION_START, payload=f"{APP_NAME} v{APP_VERSION}".encode('utf-8'))
+
+    def _write(self, kind, flags=0, point=0, x=0, y=0, payload=b""):
+        offset = self.HEADER_SIZE + (self.count % self.capacity) * self.RECORD_SIZE
+        self.RECORD.pack_into(self.mm, offset, time.time(), kind, flags, point, x, y)
+        payload = payload[:self.PAYLOAD_SIZE]
+        self.mm[offset + self.RECORD.size:offset + self.RECORD_SIZE] = payload.ljust(self.PAYLOAD_SIZE, b"\0")
+        self.count += 1
+        struct.pack_into("<Q", self.mm, 20, self.count)
+
+    def record_profile_switch(self, name):
+        self._write(self.PROFILE_SWITCH, payload=name.encode('utf-8'))
+
+    def record_visibility(self, visible):
+        self._write(self.VISIBILITY, flags=int(bool(visible)))
+
+    def record_calibration(self, coordinates):
+        # До 27 точек по два int16 — ровно столько помещается в запись
+        values = [max(-32768, min(32767, v)) for pos in coordinates[:self.PAYLOAD_SIZE // 4] for v in pos]
+        self._write(self.CALIBRATION, flags=len(values) // 2, payload=struct.pack(f"<{len(values)}h", *values))
+
+    def record_point_edit(self, profile_name, index, x, y):
+        self._write(self.POINT_EDIT, point=index, x=x, y=y, payload=profile_name.encode('utf-8'))
+
+    def record_annotations(self, items, clear=False):
+        if clear: self._write(self.ANNOTATION, flags=self.ANNOTATION_CLEAR)
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("point"), int): continue
+            text, color, flags = item.get("text"), item.get("color"), 0
+            if text is not None: flags |= self.ANNOTATION_TEXT
+            if isinstance(color, list) and len(color) >= 3:
+                flags |= self.ANNOTATION_COLOR
+                packed = (int(color[0]) & 255) << 16 | (int(color[1]) & 255) << 8 | (int(color[2]) & 255)
+            else: packed = 0
+            self._write(self.ANNOTATION, flags=flags, point=item["point"], x=packed,
+                        payload=str(text).encode('utf-8') if text is not None else b"")
+
+    def record_board_state(self, checkers):
+        values = [max(-128, min(127, n)) for n in checkers[:len(NUMBER_MAPPING)]]
+        self._write(self.BOARD_STATE, flags=len(values), payload=struct.pack(f"<{len(values)}b", *values))
+
+    def close(self):
+        self.mm.flush()
+        self.mm.close()
+        self._file.close()
+
+def read_session_records(path=SESSION_RECORD_FILE):
+    """Читает записи кольцевого файла по порядку, от самой старой к самой новой."""
+    R = SessionRecorder
+    with open(path, 'rb') as f: data = f.read()
+    magic, version, record_size, capacity, count, _ = R.HEADER.unpack_from(data, 0)
+    if magic != R.MAGIC or version != 1 or record_size != R.RECORD_SIZE:
+        raise ValueError(f"{path}: не файл записи {APP_NAME}")
+    records = []
+    for n in range(max(0, count - capacity), count):
+        offset = R.HEADER_SIZE + (n % capacity) * R.RECORD_SIZE
+        t, kind, flags, point, x, y = R.RECORD.unpack_from(data, offset)
+        payload = data[offset + R.RECORD.size:offset + R.RECORD_SIZE]
+        record = {"t": t, "type": kind}
+        if kind in (R.SESSION_START, R.PROFILE_SWITCH):
+            record["text"] = payload.rstrip(b"\0").decode('utf-8', errors='ignore')
+        elif kind == R.VISIBILITY:
+            record["visible"] = bool(flags)
+        elif kind == R.CALIBRATION:
+            values = struct.unpack_from(f"<{flags * 2}h", payload)
+            record["coordinates"] = [list(values[i:i + 2]) for i in range(0, len(values), 2)]
+        elif kind == R.POINT_EDIT:
+            record.update(profile=payload.rstrip(b"\0").decode('utf-8', errors='ignore'), index=point, pos=[x, y])
+        elif kind == R.ANNOTATION:
+            record["clear"] = bool(flags & R.ANNOTATION_CLEAR)
+            if not record["clear"]:
+                item = {"point": point}
+                if flags & R.ANNOTATION_TEXT: item["text"] = payload.rstrip(b"\0").decode('utf-8', errors='ignore')
+                if flags & R.ANNOTATION_COLOR: item["color"] = [(x >> 16) & 255, (x >> 8) & 255, x & 255]
+                record["item"] = item
+        elif kind == R.BOARD_STATE:
+            record["board"] = list(struct.unpack_from(f"<{flags}b", payload))
+        records.append(record)
+    return records
+
+class SessionReplayer(QObject):
+    """Воспроизводит записанную сессию на OverlayWindow в реальном темпе или без пауз.
+
+    Изменения применяются к конфигурации контроллера окна (overlay.controller.config),
+    поэтому для разбора инцидентов окно обычно создается над копией config.json.
+    """
+    finished = pyqtSignal()
+    board_state = pyqtSignal(list)
+
+    def __init__(self, overlay, records, speed=1.0, parent=None):
+        super().__init__(parent)
+        self.overlay = overlay
+        self.records = records
+        self.speed = speed  # 0 — без пауз
+        self.applied = 0
+        self._index = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._apply_next)
+
+    def start(self):
+        self._index = 0
+        self._started = time.perf_counter()
+        self._timer.start(0)
+
+    def _apply_next(self):
+        if self._index >= len(self.records):
+            self.finished.emit()
+            return
+        self.apply(self.records[self._index])
+        self._index += 1
+        if self._index >= len(self.records) or self.speed <= 0:
+            self._timer.start(0)
+            return
+        due = (self.records[self._index]["t"] - self.records[0]["t"]) / self.speed
+        self._timer.start(max(0, int((due - (time.perf_counter() - self._started)) * 1000)))
+
+    def apply(self, record):
+        R, overlay = SessionRecorder, self.overlay
+        config = overlay.controller.config
+        kind = record["type"]
+        if kind == R.PROFILE_SWITCH and record["text"]:
+            # Профиль, созданный или переименованный после снимка конфигурации, заводится
+            # пустым, чтобы следующие калибровки не попали в чужой стол
+            config["profiles"].setdefault(record["text"], get_default_profile())
+            config["active_profile_name"] = record["text"]
+            overlay.update_fonts_from_config()
+        elif kind == R.VISIBILITY:
+            overlay.setVisible(record["visible"])
+        elif kind == R.CALIBRATION and config["active_profile_name"] in config["profiles"]:
+            config["profiles"][config["active_profile_name"]]["coordinates"] = record["coordinates"]
+            overlay.invalidate_board(config["active_profile_name"])
+        elif kind == R.POINT_EDIT and record["profile"] in config["profiles"]:
+            coords = config["profiles"][record["profile"]].get("coordinates", [])
+            if 0 <= record["index"] < len(coords):
+                coords[record["index"]] = record["pos"]
+                overlay.invalidate_board(record["profile"])
+        elif kind == R.ANNOTATION:
+            overlay.apply_annotations([record["item"]] if "item" in record else [], record["clear"])
+        elif kind == R.BOARD_STATE:
+            self.board_state.emit(record["board"])
+        else:
+            return
+        self.applied += 1
+
+# --- Фоновая отрисовка предпросмотра ---
+class PreviewRenderSignals(QObject):
+    """Сигналы задачи отрисовки (QRunnable не может иметь собственных сигналов)."""
+    finished = pyqtSignal(int, QImage)
+
+class PreviewRenderTask(QRunnable):
+    """Рисует все 24 номера в QImage вне GUI-потока."""
+    def __init__(self, request_id, settings, points, size):
+        super().__init__()
+        self.request_id = request_id
+        self.settings = settings
+        self.points = points
+        self.size = size
+        self.signals = PreviewRenderSignals()
+
+    def run(self):
+        fs = self.settings
+        image = QImage(self.size[0], self.size[1], QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(Qt.GlobalColor.transparent)
+        font = QFont(fs['family'], fs['size'], QFont.Weight.Bold)
+        font_color = QColor(*fs['color_rgb'])
+        outline_color = QColor(*fs['outline_color_rgb'])
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        for i, (x, y) in enumerate(self.points):
+            display_num = NUMBER_MAPPING.get(str(i + 1))
+            if display_num is not None:
+                draw_number(painter, QPointF(x, y), str(display_num), font,
+                            font_color, outline_color, fs['outline_width'])
+        painter.end()
+        self.signals.finished.emit(self.request_id, image)
+
 # --- Классы Окон ---
 
 class MainWindow(QMainWindow):
@@ -145,6 +1147,17 @@ class MainWindow(QMainWindow):
         self.config_button.setToolTip("Перейти в режим расстановки номеров на экране")
         self.config_button.clicked.connect(self.controller.start_config_mode)
 
+        self.quick_config_button = QPushButton("Быстрая калибровка")
+        self.quick_config_button.setToolTip("Указать несколько пунктов-якорей, остальные будут рассчитаны автоматически")
+        self.quick_config_button.clicked.connect(self.controller.start_fit_mode)
+        if np is None:
+            self.quick_config_button.setEnabled(False)
+            self.quick_config_button.setToolTip("Требуется пакет numpy")
+
+        self.edit_points_button = QPushButton("Редактировать точки")
+        self.edit_points_button.setToolTip("Перетащить отдельные номера мышью, не расставляя все заново")
+        self.edit_points_button.clicked.connect(self.controller.start_edit_mode)
+
         self.settings_button = QPushButton("Настройки оформления...")
         self.settings_button.setToolTip("Открыть окно для изменения шрифта, цвета и размера номеров")
         self.settings_button.clicked.connect(self.controller.open_settings_window)
@@ -152,11 +1165,18 @@ class MainWindow(QMainWindow):
         self.clear_coords_button = QPushButton("Очистить координаты")
         self.clear_coords_button.setToolTip("Удалить текущую расстановку номеров для этого профиля")
         self.clear_coords_button.clicked.connect(self.controller.clear_coordinates)
+
+        self.session_button = QPushButton("Мультистол...")
+        self.session_button.setToolTip("Выбрать профили, которые показываются одновременно с текущим")
+        self.session_button.clicked.connect(self.controller.open_session_window)
         
         button_grid.addWidget(self.toggle_button, 0, 0, 1, 2)
         button_grid.addWidget(self.config_button, 1, 0)
-        button_grid.addWidget(self.clear_coords_button, 1, 1)
-        button_grid.addWidget(self.settings_button, 2, 0, 1, 2)
+        button_grid.addWidget(self.quick_config_button, 1, 1)
+        button_grid.addWidget(self.edit_points_button, 2, 0)
+        button_grid.addWidget(self.clear_coords_button, 2, 1)
+        button_grid.addWidget(self.session_button, 3, 0)
+        button_grid.addWidget(self.settings_button, 3, 1)
         layout.addLayout(button_grid)
 
         self.log_box = QTextEdit()
@@ -179,6 +1199,9 @@ class MainWindow(QMainWindow):
         about_action = QAction("&О программе", self)
         about_action.triggered.connect(self.controller.show_about_dialog)
         help_menu.addAction(about_action)
+        stalls_action = QAction("&Журнал зависаний...", self)
+        stalls_action.triggered.connect(self.controller.show_stall_reports)
+        help_menu.addAction(stalls_action)
 
     def update_log(self, text):
         self.log_box.moveCursor(QTextCursor.MoveOperation.End)
@@ -206,13 +1229,87 @@ class MainWindow(QMainWindow):
         self.profile_combo.blockSignals(False)
 
 
+class StallReportsWindow(QDialog):
+    """Список зафиксированных зависаний GUI-потока со стеком блокирующего места."""
+    def __init__(self, reports, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Журнал зависаний")
+        self.setMinimumSize(650, 400)
+        layout = QVBoxLayout(self)
+        text_box = QTextEdit()
+        text_box.setReadOnly(True)
+        text_box.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        if reports:
+            text_box.setPlainText("\n".join(
+                f"[{r['time']}] {r['duration_ms']} мс — {r['blocking_frame']}\n{r['stack']}"
+                for r in reversed(reports)))
+        else:
+            text_box.setPlainText("Зависаний не обнаружено.")
+        layout.addWidget(text_box)
+        layout.addWidget(QLabel(f"Полный журнал: {os.path.abspath(STALL_LOG_FILE)}"))
+        close_button = QPushButton("Закрыть")
+        close_button.clicked.connect(self.accept)
+        layout.addWidget(close_button, alignment=Qt.AlignmentFlag.AlignRight)
+
+class SessionWindow(QDialog):
+    """Выбор профилей-столов, которые рисуются одновременно с активным."""
+    def __init__(self, profiles, active_profile, session_profiles, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Мультистол")
+        self.setModal(True)
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel("Показывать вместе с текущим профилем:"))
+        self.profile_list = QListWidget()
+        for name in profiles:
+            item = QListWidgetItem(name)
+            if name == active_profile:
+                item.setText(f"{name} (активный)")
+                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEnabled)
+                item.setCheckState(Qt.CheckState.Checked)
+            else:
+                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+                item.setCheckState(Qt.CheckState.Checked if name in session_profiles else Qt.CheckState.Unchecked)
+            item.setData(Qt.ItemDataRole.UserRole, name)
+            self.profile_list.addItem(item)
+        layout.addWidget(self.profile_list)
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.save_button = QPushButton("Сохранить")
+        self.save_button.clicked.connect(self.accept)
+        self.cancel_button = QPushButton("Отмена")
+        self.cancel_button.clicked.connect(self.reject)
+        button_layout.addWidget(self.save_button)
+        button_layout.addWidget(self.cancel_button)
+        layout.addLayout(button_layout)
+        self.active_profile = active_profile
+
+    def get_session_profiles(self):
+        names = []
+        for row in range(self.profile_list.count()):
+            item = self.profile_list.item(row)
+            name = item.data(Qt.ItemDataRole.UserRole)
+            if name != self.active_profile and item.checkState() == Qt.CheckState.Checked:
+                names.append(name)
+        return names
+
 class SettingsWindow(QDialog):
     """Окно для визуальной настройки с живым предпросмотром."""
-    def __init__(self, current_font_config, parent=None):
+    def __init__(self, current_font_config, parent=None, coordinates=None):
         super().__init__(parent)
         self.font_config = current_font_config
         self.setWindowTitle("Настройки оформления")
         self.setModal(True)
+        self._preview_points, self._preview_size = get_preview_layout(coordinates)
+        # Один рабочий поток: в очереди держим только самый свежий запрос
+        self._render_pool = QThreadPool(self)
+        self._render_pool.setMaxThreadCount(1)
+        self._preview_request_id = 0
+        self._render_in_flight = False
+        self._render_pending = False
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(PREVIEW_FRAME_MS)
+        self._preview_timer.timeout.connect(self._render_preview)
         self.initUI()
         self._update_preview()
 
@@ -269,10 +1366,14 @@ class SettingsWindow(QDialog):
         main_layout.addLayout(form_layout)
 
         self.preview_label = QLabel("Предпросмотр")
-        self.preview_label.setMinimumSize(200, 100)
+        self.preview_label.setFixedSize(*self._preview_size)
         self.preview_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.preview_label.setStyleSheet("background-color: #555; border: 1px solid #888; border-radius: 5px;")
-        main_layout.addWidget(self.preview_label)
+        self.preview_label.setStyleSheet("background-color: #555;")
+        self.preview_scroll = QScrollArea()
+        self.preview_scroll.setWidget(self.preview_label)
+        self.preview_scroll.setMinimumSize(480, 260)
+        self.preview_scroll.setStyleSheet("background-color: #555; border: 1px solid #888; border-radius: 5px;")
+        main_layout.addWidget(self.preview_scroll)
 
         button_layout = QHBoxLayout()
         self.reset_button = QPushButton("Сбросить по умолчанию")
@@ -288,19 +1389,36 @@ class SettingsWindow(QDialog):
         main_layout.addLayout(button_layout)
 
     def _update_preview(self):
-        font = self.font_combo.currentFont()
-        font.setPointSize(self.font_size_spin.value())
-        font.setBold(True)
-        pixmap = QPixmap(self.preview_label.size())
-        pixmap.fill(Qt.GlobalColor.transparent)
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        draw_number(painter, pixmap.rect().center(), "12", font, 
-                    self.font_color, self.outline_color, 
-                    self.outline_width_spin.value())
-        painter.end()
-        self.preview_label.setPixmap(pixmap)
-        
+        """Планирует перерисовку: все изменения в пределах кадра склеиваются в одну."""
+        if not self._preview_timer.isActive():
+            self._preview_timer.start()
+
+    def _render_preview(self):
+        if self._render_in_flight:
+            # Пока рисуется предыдущий кадр, запоминаем лишь факт нового запроса
+            self._render_pending = True
+            return
+        self._render_in_flight = True
+        self._preview_request_id += 1
+        task = PreviewRenderTask(self._preview_request_id, self.get_settings(),
+                                 self._preview_points, self._preview_size)
+        task.signals.finished.connect(self._on_preview_rendered)
+        self._render_pool.start(task)
+
+    def _on_preview_rendered(self, request_id, image):
+        self._render_in_flight = False
+        if request_id == self._preview_request_id:
+            self.preview_label.setPixmap(QPixmap.fromImage(image))
+        if self._render_pending:
+            self._render_pending = False
+            self._render_preview()
+
+    def done(self, result):
+        self._preview_timer.stop()
+        self._render_pending = False
+        self._render_pool.waitForDone()
+        super().done(result)
+
     def _reset_to_defaults(self):
         defaults = get_default_profile()['font_settings']
         self.font_combo.setCurrentFont(QFont(defaults['family']))
@@ -337,12 +1455,71 @@ class SettingsWindow(QDialog):
             "outline_width": self.outline_width_spin.value()
         }
 
+class LabelCache:
+    """Готовые изображения номеров, общие для всех досок оверлея.
+
+    Ключ — текст и стиль, поэтому доски с одинаковым оформлением делят записи.
+    Смещение изображения относительно точки повторяет центровку draw_number.
+    """
+    def __init__(self, max_items=LABEL_CACHE_SIZE):
+        self.max_items = max_items
+        self._items = OrderedDict()
+
+    def get(self, text, style, metrics_font, dpr=1.0):
+        key = (text, style, metrics_font.key(), dpr)
+        item = self._items.get(key)
+        if item is not None:
+            self._items.move_to_end(key)
+            return item
+        family, size, color_rgb, outline_rgb, outline_width = style
+        metrics = QFontMetrics(metrics_font)
+        path = QPainterPath()
+        path.addText(QPointF(-metrics.horizontalAdvance(text) / 2, metrics.boundingRect(text).height() / 2),
+                     QFont(family, size, QFont.Weight.Bold), text)
+        margin = max(outline_width, 1) / 2 + 1
+        bounds = path.boundingRect().adjusted(-margin, -margin, margin, margin).toAlignedRect()
+        image = QImage(int(bounds.width() * dpr), int(bounds.height() * dpr), QImage.Format.Format_ARGB32_Premultiplied)
+        image.setDevicePixelRatio(dpr)
+        image.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.translate(-bounds.x(), -bounds.y())
+        paint_outlined_path(painter, path, QColor(*color_rgb), QColor(*outline_rgb), outline_width)
+        painter.end()
+        item = (image, bounds.topLeft(), bounds.size())
+        self._items[key] = item
+        if len(self._items) > self.max_items: self._items.popitem(last=False)
+        return item
+
+class BoardLayer:
+    """Одна доска (профиль) на оверлее: видимые номера и занимаемая ими область."""
+    def __init__(self, name):
+        self.name = name
+        self.labels = []  # (левый верхний угол, изображение, прямоугольник)
+        self.bounds = QRect()
+
 class OverlayWindow(QWidget):
-    """Основное окно оверлея, отображающее номера на заданных координатах."""
+    """Основное окно оверлея, отображающее номера на заданных координатах.
+
+    Каждый профиль сессии (мультистол) — отдельный BoardLayer со своей
+    раскладкой и оформлением. Номера вне экранов отбрасываются при сборке
+    доски, а изменение одной доски перерисовывает только ее область.
+    """
+    visibility_changed = pyqtSignal(bool)
+    annotations_applied = pyqtSignal(list, bool)  # только принятые аннотации
     def __init__(self, controller):
         super().__init__()
         self.controller = controller
         self.setGeometry(get_total_screens_geometry())
+        # Аннотации от локальных утилит: номер пункта -> {"text": ..., "color": QColor}
+        self.annotations = {}
+        self.label_cache = LabelCache()
+        self.boards = OrderedDict()
+        self.visible_region = QRegion()
+        self._repaint_timer = QTimer(self)
+        self._repaint_timer.setSingleShot(True)
+        self._repaint_timer.setInterval(FRAME_MS)
+        self._repaint_timer.timeout.connect(lambda: self.invalidate_board(self.controller.config['active_profile_name']))
         self.update_fonts_from_config()
         self.initUI()
 
@@ -355,31 +1532,154 @@ class OverlayWindow(QWidget):
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
 
     def update_fonts_from_config(self):
-        active_profile = self.controller.get_active_profile()
-        if not active_profile: return
-        fs = active_profile['font_settings']
-        self.main_font = QFont(fs['family'], fs['size'], QFont.Weight.Bold)
-        self.font_color = QColor(*fs['color_rgb'])
-        self.outline_color = QColor(*fs['outline_color_rgb'])
-        self.outline_width = fs['outline_width']
+        """Пересобирает все доски сессии (смена профиля, конфигурации или экранов)."""
+        self.visible_region = QRegion()
+        origin = self.geometry().topLeft()
+        for screen in QApplication.screens():
+            self.visible_region = self.visible_region.united(
+                QRegion(screen.geometry().translated(-origin.x(), -origin.y())))
+        self.boards = OrderedDict((name, self._build_board(name, profile))
+                                  for name, profile in self.controller.get_session_profiles())
         self.update()
 
+    def invalidate_board(self, name):
+        """Пересобирает одну доску и перерисовывает только ее старую и новую области."""
+        old_bounds = self.boards[name].bounds if name in self.boards else QRect()
+        profile = self.controller.config["profiles"].get(name)
+        if profile is None or name not in dict(self.controller.get_session_profiles()):
+            self.boards.pop(name, None)
+            new_bounds = QRect()
+        else:
+            self.boards[name] = self._build_board(name, profile)
+            new_bounds = self.boards[name].bounds
+        dirty = old_bounds.united(new_bounds)
+        if not dirty.isEmpty(): self.update(dirty)
+
+    def _build_board(self, name, profile):
+        board = BoardLayer(name)
+        fs = profile['font_settings']
+        style = (fs['family'], fs['size'], tuple(fs['color_rgb']), tuple(fs['outline_color_rgb']), fs['outline_width'])
+        is_active = name == self.controller.config['active_profile_name']
+        metrics_font, dpr = self.font(), self.devicePixelRatioF()
+        origin = self.geometry().topLeft()
+        for i, (x, y) in enumerate(profile.get("coordinates", [])):
+            display_num = NUMBER_MAPPING.get(str(i + 1))
+            if display_num is None: continue
+            text, label_style = str(display_num), style
+            annotation = self.annotations.get(i + 1) if is_active else None
+            if annotation:
+                text = annotation.get("text", text)
+                if "color" in annotation:
+                    label_style = (style[0], style[1], tuple(annotation["color"].getRgb()[:3])) + style[3:]
+            image, offset, size = self.label_cache.get(text, label_style, metrics_font, dpr)
+            rect = QRect(local_point(origin, x, y) + offset, size)
+            if not self.visible_region.intersects(rect): continue
+            board.labels.append((rect.topLeft(), image, rect))
+            board.bounds = board.bounds.united(rect)
+        return board
+
+    def apply_annotations(self, items, clear=False):
+        """Применяет пачку аннотаций; перерисовка откладывается и склеивается до кадра.
+
+        Некорректные элементы отбрасываются; возвращается список принятых.
+        """
+        if clear: self.annotations.clear()
+        accepted = []
+        for item in items:
+            if not isinstance(item, dict): continue
+            point = item.get("point")
+            if type(point) is not int or str(point) not in NUMBER_MAPPING: continue
+            text, color = item.get("text"), item.get("color")
+            if color is not None and not (isinstance(color, list) and len(color) == 3
+                                          and all(type(c) is int and 0 <= c <= 255 for c in color)):
+                continue
+            if text is None and color is None:
+                self.annotations.pop(point, None)
+                accepted.append({"point": point})
+                continue
+            annotation, clean = {}, {"point": point}
+            if text is not None: annotation["text"] = clean["text"] = str(text)
+            if color is not None:
+                annotation["color"] = QColor(*color)
+                clean["color"] = list(color)
+            self.annotations[point] = annotation
+            accepted.append(clean)
+        if not self._repaint_timer.isActive():
+            self._repaint_timer.start()
+        if accepted or clear: self.annotations_applied.emit(accepted, clear)
+        return accepted
+
+    def showEvent(self, event):
+        self.visibility_changed.emit(True)
+
+    def hideEvent(self, event):
+        self.visibility_changed.emit(False)
+
     def paintEvent(self, event):
-        active_profile = self.controller.get_active_profile()
-        if not active_profile or not active_profile.get("coordinates"): return
+        if not self.boards: return
+        clip = event.rect()
         painter = QPainter(self)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        for i, (x, y) in enumerate(active_profile["coordinates"]):
-            local_pos = self.mapFromGlobal(QPoint(x, y))
-            display_num = NUMBER_MAPPING.get(str(i + 1))
-            if display_num is not None:
-                draw_number(painter, local_pos, str(display_num), self.main_font,
-                            self.font_color, self.outline_color, self.outline_width)
+        for board in self.boards.values():
+            if not board.bounds.intersects(clip): continue
+            for top_left, image, rect in board.labels:
+                if rect.intersects(clip): painter.drawImage(top_left, image)
+
+class PointGrid:
+    """Равномерная сетка для поиска точки под курсором.
+
+    Поиск просматривает только соседние ячейки, поэтому его цена не растет
+    с числом досок на экране.
+    """
+    def __init__(self, cell=EDIT_GRID_CELL):
+        self.cell = cell
+        self._cells = {}
+        self._points = {}
+
+    def _cell_of(self, x, y):
+        return (int(x) // self.cell, int(y) // self.cell)
+
+    def insert(self, key, x, y):
+        self.remove(key)
+        self._points[key] = (x, y)
+        self._cells.setdefault(self._cell_of(x, y), set()).add(key)
+
+    def remove(self, key):
+        if key not in self._points: return
+        cell = self._cell_of(*self._points.pop(key))
+        self._cells[cell].discard(key)
+        if not self._cells[cell]: del self._cells[cell]
+
+    def clear(self):
+        self._cells.clear()
+        self._points.clear()
+
+    def nearest(self, x, y, radius):
+        """Ближайшая точка не дальше radius или None."""
+        (cx0, cy0), (cx1, cy1) = self._cell_of(x - radius, y - radius), self._cell_of(x + radius, y + radius)
+        best, best_dist = None, radius * radius
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                for key in self._cells.get((cx, cy), ()):
+                    px, py = self._points[key]
+                    dist = (px - x) ** 2 + (py - y) ** 2
+                    if dist <= best_dist: best, best_dist = key, dist
+        return best
+
+    def __len__(self):
+        return len(self._points)
 
 class ConfigOverlay(QWidget):
-    """Окно для режима настройки координат."""
+    """Окно для режима настройки координат.
+
+    В режиме редактирования (edit_mode) показывает уже сохраненные точки всех
+    досок сессии и позволяет перетаскивать их мышью. В режиме быстрой
+    калибровки (fit_mode) пользователь ставит несколько якорей, а остальные
+    пункты достраивает fit_board_layout.
+    """
     config_finished = pyqtSignal(list)
     config_cancelled = pyqtSignal()
+    edit_finished = pyqtSignal()
+    point_moved = pyqtSignal(str, int, int, int)
 
     def __init__(self, controller):
         super().__init__()
@@ -387,6 +1687,20 @@ class ConfigOverlay(QWidget):
         self.setGeometry(get_total_screens_geometry())
         self.new_coords = []
         self.mouse_pos = QPoint(0, 0)
+        self.tracer = None
+        self.edit_mode = False
+        self.edit_points = {}   # (профиль, индекс) -> [x, y] в глобальных координатах
+        self.edit_styles = {}   # профиль -> стиль для LabelCache
+        self.edit_labels = {}   # (профиль, индекс) -> (изображение, прямоугольник)
+        self.edit_index = PointGrid()
+        self.edit_history = []
+        self.label_cache = LabelCache()
+        self._drag_key = None
+        self._drag_delta = QPoint()
+        self._drag_origin = None
+        self.fit_mode = False
+        self.anchors = {}       # номер пункта -> [x, y], в порядке установки
+        self.fit = None
         self.update_fonts_from_config()
         self.initUI()
 
@@ -408,6 +1722,88 @@ class ConfigOverlay(QWidget):
         self.info_font = QFont("Arial", 18)
         self.total_points = len(NUMBER_MAPPING)
 
+    def start_fitting(self):
+        self.fit_mode = True
+        self.anchors.clear()
+        self.fit = None
+
+    def _next_anchor(self):
+        """Следующий обязательный якорь или None, если основные уже поставлены."""
+        return next((n for n in FIT_ANCHOR_ORDER if n not in self.anchors), None)
+
+    def _refit(self):
+        self.fit = fit_board_layout(self.anchors)
+
+    def _fit_mouse_press(self, event):
+        pos = event.globalPosition().toPoint()
+        if event.button() == Qt.MouseButton.LeftButton:
+            point = self._next_anchor()
+            if point is None and self.fit:
+                # Дополнительный якорь уточняет ближайший еще не закрепленный пункт
+                free = [(n, p) for n, p in enumerate(self.fit["points"], start=1) if n not in self.anchors]
+                if not free: return
+                point = min(free, key=lambda item: (item[1][0] - pos.x()) ** 2 + (item[1][1] - pos.y()) ** 2)[0]
+            if point is None: return
+            self.anchors[point] = [pos.x(), pos.y()]
+            self._refit()
+            if self.fit is None and len(self.anchors) >= 3:
+                # Вырожденные якоря (например, клики в одну точку) — подгонка невозможна
+                del self.anchors[point]
+                self._refit()
+                print(f"Якорь {point} отклонен: по таким якорям раскладку не подогнать (правая кнопка — отменить предыдущий).")
+                self.update()
+                return
+            print(f"Якорь: пункт {point}" + (f", ошибка подгонки {self.fit['rms']:.1f} px." if self.fit else "."))
+            if self.fit and self.fit["outliers"]:
+                print(f"Подозрительные якоря: {', '.join(map(str, self.fit['outliers']))}.")
+        elif event.button() == Qt.MouseButton.RightButton and self.anchors:
+            point = next(reversed(self.anchors))
+            del self.anchors[point]
+            self._refit()
+            print(f"Якорь {point} удален. Осталось {len(self.anchors)}.")
+        self.update()
+
+    def start_editing(self, boards):
+        """Загружает точки досок [(профиль, данные профиля), ...] для перетаскивания."""
+        self.edit_mode = True
+        self.edit_history.clear()
+        self._drag_key = None
+        self.edit_points = {(name, i): list(pos) for name, profile in boards
+                            for i, pos in enumerate(profile["coordinates"]) if str(i + 1) in NUMBER_MAPPING}
+        self.edit_styles = {}
+        for name, profile in boards:
+            fs = profile['font_settings']
+            self.edit_styles[name] = (fs['family'], fs['size'], tuple(fs['color_rgb']),
+                                      tuple(fs['outline_color_rgb']), fs['outline_width'])
+        self._rebuild_edit_labels()
+
+    def _rebuild_edit_labels(self):
+        self.edit_index.clear()
+        self.edit_labels.clear()
+        for key in self.edit_points:
+            self._place_edit_label(key)
+
+    def _place_edit_label(self, key):
+        """Обновляет изображение и прямоугольник номера; в сетку кладется его видимый центр."""
+        name, index = key
+        image, offset, size = self.label_cache.get(str(index + 1), self.edit_styles[name], self.font(),
+                                                   self.devicePixelRatioF())
+        x, y = self.edit_points[key]
+        origin = self.geometry().topLeft()
+        rect = QRect(local_point(origin, x, y) + offset, size)
+        self.edit_labels[key] = (image, rect)
+        center = rect.center() + origin
+        self.edit_index.insert(key, center.x(), center.y())
+        return rect
+
+    def _move_edit_point(self, key, x, y):
+        old_rect = self.edit_labels[key][1]
+        self.edit_points[key] = [x, y]
+        new_rect = self._place_edit_label(key)
+        # Перерисовываются только старое и новое место номера
+        self.update(old_rect)
+        self.update(new_rect)
+
     def wheelEvent(self, event):
         active_profile = self.controller.get_active_profile()
         if not active_profile: return
@@ -418,16 +1814,84 @@ class ConfigOverlay(QWidget):
         if new_size != current_size:
             active_profile['font_settings']['size'] = new_size
             self.update_fonts_from_config()
+            if self.edit_mode:
+                name = self.controller.config['active_profile_name']
+                if name in self.edit_styles:
+                    self.edit_styles[name] = self.edit_styles[name][:1] + (new_size,) + self.edit_styles[name][2:]
+                self._rebuild_edit_labels()
             self.update()
 
     def keyPressEvent(self, event):
-        if event.key() == Qt.Key.Key_Escape: self.config_cancelled.emit()
+        if event.key() == Qt.Key.Key_Escape:
+            if self.edit_mode: self.edit_finished.emit()
+            else: self.config_cancelled.emit()
+        elif self.fit_mode and event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+            if self.fit and self._next_anchor() is None:
+                self.config_finished.emit(self.fit["points"])
+
+    def update(self, *args):
+        if self.tracer: self.tracer.note_update()
+        super().update(*args)
+
+    def _traced_input(self, kind, event, handler, button=None):
+        """Вызывает обработчик ввода; при трассировке связывает событие с перерисовкой."""
+        if not self.tracer: return handler(event)
+        self.tracer.stamp_input(kind, event, button)
+        try: handler(event)
+        finally: self.tracer.end_input()
 
     def mouseMoveEvent(self, event):
+        self._traced_input("move", event, self._mouse_move)
+
+    def _mouse_move(self, event):
+        if self.edit_mode:
+            pos = event.globalPosition().toPoint()
+            if self._drag_key:
+                anchor = pos - self._drag_delta
+                self._move_edit_point(self._drag_key, anchor.x(), anchor.y())
+            else:
+                hovered = self.edit_index.nearest(pos.x(), pos.y(), EDIT_HIT_RADIUS)
+                self.setCursor(Qt.CursorShape.OpenHandCursor if hovered else Qt.CursorShape.CrossCursor)
+            return
         self.mouse_pos = event.position().toPoint()
         self.update()
 
+    def mouseReleaseEvent(self, event):
+        if not (self.edit_mode and self._drag_key and event.button() == Qt.MouseButton.LeftButton): return
+        key, self._drag_key = self._drag_key, None
+        self.setCursor(Qt.CursorShape.OpenHandCursor)
+        x, y = self.edit_points[key]
+        if [x, y] != self._drag_origin:
+            self.edit_history.append((key, self._drag_origin))
+            self.point_moved.emit(key[0], key[1], x, y)
+            print(f"Пункт {key[1] + 1} профиля '{key[0]}' перемещен в ({x}, {y}).")
+
+    def _edit_mouse_press(self, event):
+        pos = event.globalPosition().toPoint()
+        if event.button() == Qt.MouseButton.LeftButton:
+            key = self.edit_index.nearest(pos.x(), pos.y(), EDIT_HIT_RADIUS)
+            if key is None: return
+            self._drag_key = key
+            self._drag_origin = list(self.edit_points[key])
+            self._drag_delta = pos - QPoint(*self._drag_origin)
+            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+        elif event.button() == Qt.MouseButton.RightButton and self.edit_history and not self._drag_key:
+            key, (x, y) = self.edit_history.pop()
+            self._move_edit_point(key, x, y)
+            self.point_moved.emit(key[0], key[1], x, y)
+            print(f"Перемещение пункта {key[1] + 1} профиля '{key[0]}' отменено.")
+
     def mousePressEvent(self, event):
+        button = {Qt.MouseButton.LeftButton: "left", Qt.MouseButton.RightButton: "right"}.get(event.button())
+        self._traced_input("press", event, self._mouse_press, button)
+
+    def _mouse_press(self, event):
+        if self.edit_mode:
+            self._edit_mouse_press(event)
+            return
+        if self.fit_mode:
+            self._fit_mouse_press(event)
+            return
         if event.button() == Qt.MouseButton.LeftButton:
             if len(self.new_coords) < self.total_points:
                 pos = event.globalPosition().toPoint()
@@ -445,11 +1909,93 @@ class ConfigOverlay(QWidget):
                 self.update()
 
     def paintEvent(self, event):
+        if self.tracer: self.tracer.begin_paint()
+        if self.edit_mode: self._paint_edit_scene(event.rect())
+        elif self.fit_mode: self._paint_fit_scene()
+        else: self._paint_scene()
+        if self.tracer: self.tracer.end_paint()
+
+    def _paint_edit_scene(self, clip):
+        painter = QPainter(self)
+        painter.fillRect(clip, QColor(0, 0, 0, 90))
+        for image, rect in self.edit_labels.values():
+            if rect.intersects(clip): painter.drawImage(rect.topLeft(), image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self._paint_banner(painter, clip, "РЕДАКТИРОВАНИЕ ТОЧЕК", (
+            "Перетащите номер левой кнопкой мыши\n\n"
+            "Правая кнопка мыши: отменить последнее перемещение\n"
+            "Колесико мыши: изменить размер шрифта\n"
+            "ESC: завершить (правки уже сохранены)"
+        ))
+
+    def _paint_fit_scene(self):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         painter.fillRect(self.rect(), QColor(0, 0, 0, 90))
+        origin = self.geometry().topLeft()
+        if self.fit:
+            # Живой предпросмотр подогнанной раскладки
+            painter.setOpacity(0.55)
+            for n, (x, y) in enumerate(self.fit["points"], start=1):
+                if n not in self.anchors:
+                    draw_number(painter, local_point(origin, x, y), str(n), self.main_font,
+                                self.font_color, self.outline_color, self.outline_width)
+            painter.setOpacity(1.0)
+        outliers = self.fit["outliers"] if self.fit else []
+        for n, (x, y) in self.anchors.items():
+            local_pos = local_point(origin, x, y)
+            draw_number(painter, local_pos, str(n), self.main_font,
+                        self.font_color, self.outline_color, self.outline_width)
+            if n in outliers:
+                painter.setPen(QPen(QColor(255, 60, 60), 3))
+                painter.setBrush(Qt.BrushStyle.NoBrush)
+                painter.drawEllipse(local_pos, EDIT_HIT_RADIUS, EDIT_HIT_RADIUS)
+        next_anchor = self._next_anchor()
+        if next_anchor is not None:
+            painter.setOpacity(0.7)
+            draw_number(painter, self.mouse_pos, str(next_anchor), self.main_font,
+                        self.font_color, self.outline_color, self.outline_width)
+            painter.setOpacity(1.0)
+            info_text = (f"Кликните на пункт №{next_anchor} "
+                         f"(якорь {len(self.anchors) + 1} / {len(FIT_ANCHOR_ORDER)})\n\n"
+                         "Правая кнопка мыши: отменить последний якорь\n"
+                         "ESC: выйти из настройки")
+        else:
+            fit_text = (f"Ошибка подгонки: {self.fit['rms']:.1f} px" +
+                        (f", выбросы (не учитываются): {', '.join(map(str, outliers))}" if outliers else "")) if self.fit else ""
+            info_text = (f"{fit_text}\n"
+                         "Клик по пункту: добавить уточняющий якорь\n"
+                         "Правая кнопка мыши: отменить последний якорь\n"
+                         "Enter: сохранить, ESC: выйти")
+        self._paint_banner(painter, self.rect(), "БЫСТРАЯ КАЛИБРОВКА", info_text)
+
+    def _paint_banner(self, painter, clip, title, info_text):
+        center_point = self.rect().center()
+        banner_width, banner_height = 600, 240
+        banner_rect = QRect(0, 0, banner_width, banner_height)
+        banner_rect.moveCenter(center_point)
+        if not banner_rect.intersects(clip): return
+
+        painter.setBrush(QColor(0, 0, 0, 180))
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.drawRoundedRect(banner_rect, 15, 15)
+        
+        painter.setPen(QColor(255, 255, 255))
+        painter.setFont(self.title_font)
+        title_rect = QRect(banner_rect.x(), banner_rect.y() + 15, banner_width, 50)
+        painter.drawText(title_rect, Qt.AlignmentFlag.AlignHCenter, title)
+
+        painter.setFont(self.info_font)
+        text_rect = QRect(banner_rect.x(), banner_rect.y() + 60, banner_width, 160)
+        painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, info_text)
+
+    def _paint_scene(self):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.fillRect(self.rect(), QColor(0, 0, 0, 90))
+        origin = self.geometry().topLeft()
         for i, pos in enumerate(self.new_coords):
-            local_pos = self.mapFromGlobal(QPoint(pos[0], pos[1]))
+            local_pos = local_point(origin, pos[0], pos[1])
             display_num = NUMBER_MAPPING.get(str(i + 1))
             if display_num is not None:
                 draw_number(painter, local_pos, str(display_num), self.main_font,
@@ -462,40 +2008,23 @@ class ConfigOverlay(QWidget):
                 draw_number(painter, self.mouse_pos, str(preview_num), self.main_font,
                             self.font_color, self.outline_color, self.outline_width)
             painter.setOpacity(1.0)
-            
-            center_point = self.rect().center()
-            banner_width, banner_height = 600, 240
-            banner_rect = QRect(0, 0, banner_width, banner_height)
-            banner_rect.moveCenter(center_point)
-
-            painter.setBrush(QColor(0, 0, 0, 180))
-            painter.setPen(Qt.PenStyle.NoPen)
-            painter.drawRoundedRect(banner_rect, 15, 15)
-            
-            painter.setPen(QColor(255, 255, 255))
-            painter.setFont(self.title_font)
-            title_rect = QRect(banner_rect.x(), banner_rect.y() + 15, banner_width, 50)
-            painter.drawText(title_rect, Qt.AlignmentFlag.AlignHCenter, "РЕЖИМ НАСТРОЙКИ")
-
-            painter.setFont(self.info_font)
-            info_text = (
+            self._paint_banner(painter, self.rect(), "РЕЖИМ НАСТРОЙКИ", (
                 f"Кликните на пункт №{current_index + 1} / {self.total_points}\n\n"
                 "Правая кнопка мыши: отменить последнее действие\n"
                 "Колесико мыши: изменить размер шрифта\n"
                 "ESC: выйти из настройки"
-            )
-            text_rect = QRect(banner_rect.x(), banner_rect.y() + 60, banner_width, 160)
-            painter.drawText(text_rect, Qt.AlignmentFlag.AlignCenter, info_text)
+            ))
 
 
 # --- Главный класс приложения ---
 class TrayAppController(QObject):
     """Управляет окнами, конфигурацией и иконкой в системном трее."""
-    def __init__(self, app):
+    def __init__(self, app, args=None):
         super().__init__()
         self.app = app
         self.app.setQuitOnLastWindowClosed(False)
         self.is_config_mode = False
+        self.trace_input_path = getattr(args, "trace_input", None)
         
         self.load_config()
         self.main_window = MainWindow(self)
@@ -512,9 +2041,43 @@ class TrayAppController(QObject):
 
         self.config_window.config_finished.connect(self.on_config_finished)
         self.config_window.config_cancelled.connect(lambda: self.stop_config_mode(cancelled=True))
+        self.config_window.edit_finished.connect(self.stop_config_mode)
+        self.config_window.point_moved.connect(self.record_point_edit)
 
         self.setup_tray_icon()
         self.main_window.show()
+
+        self.watch_screens()
+
+        self.instance_server = InstanceServer(self)
+        self.instance_server.command_received.connect(self.on_remote_command)
+        self.instance_server.annotations_received.connect(self.overlay_window.apply_annotations)
+        self.instance_server.listen()
+
+        self.stall_watchdog = StallWatchdog(parent=self)
+        self.stall_watchdog.stall_detected.connect(self.on_stall_detected)
+        self.app.aboutToQuit.connect(self.stall_watchdog.stop)
+        QTimer.singleShot(0, self.stall_watchdog.start)
+
+        self.board_state = None
+        self.recorder = None
+        if self.config.get("session_recorder", True):
+            try:
+                self.recorder = SessionRecorder()
+                self.recorder.record_profile_switch(self.config['active_profile_name'])
+                self.overlay_window.visibility_changed.connect(self.recorder.record_visibility)
+                self.overlay_window.annotations_applied.connect(self.recorder.record_annotations)
+                self.app.aboutToQuit.connect(self.recorder.close)
+            except (OSError, ValueError) as e:
+                print(f"Не удалось открыть файл записи сессии {SESSION_RECORD_FILE}: {e}")
+                self.recorder = None
+
+        self.state_publisher = StatePublisher(self.get_overlay_state, self,
+                                              self.config.get("spectator_allow_origin", ""))
+        self.instance_server.annotations_received.connect(self.state_publisher.mark_dirty)
+        self.instance_server.board_state_received.connect(self.on_board_state)
+        if self.config.get("spectator_port", 0):
+            self.state_publisher.listen(self.config.get("spectator_host", "127.0.0.1"), self.config["spectator_port"])
         
         active_profile = self.get_active_profile()
         if self.config.get("show_overlay_on_startup", True) and active_profile and active_profile.get("coordinates"):
@@ -525,6 +2088,7 @@ class TrayAppController(QObject):
                  print(f"--- Добро пожаловать в {APP_NAME}! ---\nКоординаты для профиля '{self.config['active_profile_name']}' еще не настроены.")
         
         self.update_all_ui()
+        if args is not None: self.apply_command_line(args)
 
     def redirect_stdout(self):
         sys.stdout = Stream(new_text=self.main_window.update_log)
@@ -553,6 +2117,18 @@ class TrayAppController(QObject):
             "<p>Утилита для отображения числового оверлея поверх экрана.</p>"
             "<p>Все управление доступно из панели управления.</p>")
 
+    def on_board_state(self, checkers):
+        """Позиция, распознанная внешней утилитой: шашки по пунктам (знак — цвет)."""
+        self.board_state = checkers
+        if self.recorder: self.recorder.record_board_state(checkers)
+        self.state_publisher.mark_dirty()
+
+    def show_stall_reports(self):
+        StallReportsWindow(list(self.stall_watchdog.reports), self.main_window).exec()
+
+    def on_stall_detected(self, report):
+        print(f"Интерфейс не отвечал {report['duration_ms']} мс: {report['blocking_frame']}")
+
     def on_tray_icon_activated(self, reason):
         if reason == QSystemTrayIcon.ActivationReason.DoubleClick: self.show_main_window()
 
@@ -560,6 +2136,25 @@ class TrayAppController(QObject):
         self.main_window.show()
         self.main_window.activateWindow()
 
+    def on_remote_command(self, argv):
+        try:
+            args, _ = build_arg_parser(exit_on_error=False).parse_known_args(argv)
+        except (argparse.ArgumentError, SystemExit) as e:
+            # Ошибка разбора не должна завершать уже запущенный экземпляр
+            print(f"Локальный канал: команда {argv} отклонена ({e}).")
+            return
+        print(f"Получена команда от другого запуска: {' '.join(argv) or '(без аргументов)'}")
+        if not (args.show or args.hide or args.profile or args.reload):
+            self.show_main_window()
+        self.apply_command_line(args)
+
+    def apply_command_line(self, args):
+        if args.trace_input: self.trace_input_path = args.trace_input
+        if self.is_config_mode: return
+        if args.reload: self.reload_config()
+        if args.profile: self.select_profile_by_name(args.profile)
+        if args.show or args.hide: self.set_overlay_visible(args.show)
+
     def migrate_old_config(self, old_config):
         """Преобразует старый формат конфига в новый с профилями."""
         print("Обнаружена старая версия конфига. Выполняется миграция...")
@@ -584,7 +2179,116 @@ class TrayAppController(QObject):
                     self.config = config_data
             except (json.JSONDecodeError, IOError): self.config = DEFAULT_CONFIG.copy()
         else: self.config = DEFAULT_CONFIG.copy()
+        self.replay_edit_journal()
+        self.remap_all_profiles()
+
+    def set_profile_coordinates(self, profile, coordinates):
+        """Задает точки профиля и запоминает их в долях экранов вместе с геометрией экранов."""
+        profile["coordinates"] = coordinates
+        normalized = normalize_coordinates(coordinates, describe_screens()) if coordinates else None
+        if normalized: profile["normalized_coordinates"] = normalized
+        else: profile.pop("normalized_coordinates", None)
+
+    def remap_all_profiles(self):
+        """Пересчитывает точки всех профилей под текущие экраны. Возвращает число изменившихся."""
+        screens = describe_screens()
+        if not screens: return 0
+        changed = 0
+        for profile in self.config["profiles"].values():
+            coordinates = profile.get("coordinates", [])
+            normalized = profile.get("normalized_coordinates")
+            if normalized is None:
+                # Старый профиль: привязываем к экранам, если все точки на них попадают
+                if coordinates: self.set_profile_coordinates(profile, coordinates)
+                continue
+            remapped = remap_coordinates(normalized, screens)
+            if remapped != coordinates:
+                profile["coordinates"] = remapped
+                changed += 1
+        return changed
+
+    def watch_screens(self):
+        self._screen_timer = QTimer(self)
+        self._screen_timer.setSingleShot(True)
+        self._screen_timer.setInterval(SCREEN_CHANGE_DEBOUNCE_MS)
+        self._screen_timer.timeout.connect(self.on_screens_changed)
+        self.app.screenAdded.connect(self._on_screen_added)
+        self.app.screenRemoved.connect(lambda _: self._screen_timer.start())
+        for screen in self.app.screens():
+            screen.geometryChanged.connect(lambda _: self._screen_timer.start())
+
+    def _on_screen_added(self, screen):
+        screen.geometryChanged.connect(lambda _: self._screen_timer.start())
+        self._screen_timer.start()
+
+    def on_screens_changed(self):
+        """Мониторы добавлены, убраны или сменили разрешение/масштаб: переносим все раскладки."""
+        geometry = get_total_screens_geometry()
+        self.overlay_window.setGeometry(geometry)
+        self.config_window.setGeometry(geometry)
+        changed = self.remap_all_profiles()
+        self.overlay_window.update_fonts_from_config()
+        if self.config_window.edit_mode:
+            # Точки профилей уже перенесены: сохраняем правки в новой системе координат
+            # и берем точки для перетаскивания заново, а не из копии до смены экранов
+            self.commit_point_edits()
+            self.config_window.start_editing(self.get_session_profiles())
+        self.config_window.update()
+        self.state_publisher.mark_dirty()
+        print(f"Конфигурация экранов изменилась ({len(self.app.screens())} шт.), "
+              f"пересчитано профилей: {changed}.")
+
+    def replay_edit_journal(self):
+        """Досливает правки точек, оставшиеся в журнале после аварийного завершения."""
+        if not os.path.exists(EDIT_JOURNAL_FILE): return
+        applied = 0
+        try:
+            with open(EDIT_JOURNAL_FILE, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try: edit = json.loads(line)
+                    except json.JSONDecodeError: continue  # недописанная последняя строка
+                    profile = self.config["profiles"].get(edit.get("profile"), {})
+                    coords = profile.get("coordinates", [])
+                    if 0 <= edit.get("index", -1) < len(coords):
+                        coords[edit["index"]] = edit["pos"]
+                        self.set_profile_coordinates(profile, coords)
+                        applied += 1
+        except IOError as e:
+            print(f"Не удалось прочитать журнал правок: {e}")
+            return
+        if applied: print(f"Восстановлено правок точек из журнала: {applied}.")
+        self.commit_point_edits()
+
+    def record_point_edit(self, profile_name, index, x, y):
+        """Применяет перемещение точки и дописывает его в журнал вместо полной перезаписи конфига."""
+        profile = self.config["profiles"].get(profile_name, {})
+        coords = profile.get("coordinates", [])
+        if not 0 <= index < len(coords): return
+        coords[index] = [x, y]
+        self.set_profile_coordinates(profile, coords)
+        if self.recorder: self.recorder.record_point_edit(profile_name, index, x, y)
+        try:
+            with open(EDIT_JOURNAL_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"profile": profile_name, "index": index, "pos": [x, y]}, ensure_ascii=False) + "\n")
+        except IOError as e: print(f"Не удалось записать правку в журнал: {e}")
+
+    def commit_point_edits(self):
+        """Сливает журнал правок в config.json одной записью."""
+        self.save_config()
+        try:
+            if os.path.exists(EDIT_JOURNAL_FILE): os.remove(EDIT_JOURNAL_FILE)
+        except OSError as e: print(f"Не удалось удалить журнал правок: {e}")
         
+    def reload_config(self):
+        self.load_config()
+        if self.config['active_profile_name'] not in self.config['profiles']:
+            self.config['active_profile_name'] = next(iter(self.config['profiles']))
+        if self.recorder: self.recorder.record_profile_switch(self.config['active_profile_name'])
+        self.config_window.update_fonts_from_config()
+        self.update_all_ui()
+        self.overlay_window.update()
+        print(f"Конфигурация перечитана из {CONFIG_FILE}.")
+
     def save_config(self):
         try:
             with open(CONFIG_FILE, 'w', encoding='utf-8') as f: json.dump(self.config, f, indent=4, ensure_ascii=False)
@@ -594,6 +2298,34 @@ class TrayAppController(QObject):
     def get_active_profile(self):
         return self.config["profiles"].get(self.config["active_profile_name"])
 
+    def get_session_profiles(self):
+        """Профили, которые рисуются сейчас: активный и выбранные столы мультистола."""
+        names = [self.config['active_profile_name']]
+        names += [n for n in self.config.get("session_profiles", []) if n not in names]
+        return [(name, self.config["profiles"][name]) for name in names
+                if name in self.config["profiles"] and self.config["profiles"][name].get("coordinates")]
+
+    def get_overlay_state(self):
+        """Снимок того, что сейчас видно на экране, для трансляции зрителям."""
+        active_profile = self.get_active_profile() or get_default_profile()
+        return {
+            "profile": self.config['active_profile_name'],
+            "visible": self.overlay_window.isVisible(),
+            "coordinates": [list(pos) for pos in active_profile.get("coordinates", [])],
+            "font_settings": json.loads(json.dumps(active_profile['font_settings'])),
+            "annotations": {
+                str(point): {key: (list(value.getRgb()[:3]) if key == "color" else value)
+                             for key, value in annotation.items()}
+                for point, annotation in self.overlay_window.annotations.items()
+            },
+            "tables": {
+                name: {"coordinates": [list(pos) for pos in profile["coordinates"]],
+                       "font_settings": json.loads(json.dumps(profile['font_settings']))}
+                for name, profile in self.get_session_profiles() if name != self.config['active_profile_name']
+            },
+            "board": self.board_state,
+        }
+
     def set_autostart_overlay(self, checked):
         self.config['show_overlay_on_startup'] = checked
         self.save_config()
@@ -602,20 +2334,37 @@ class TrayAppController(QObject):
         if self.is_config_mode: return
         active_profile = self.get_active_profile()
         if not active_profile: return
-        dialog = SettingsWindow(active_profile['font_settings'], self.main_window)
+        dialog = SettingsWindow(active_profile['font_settings'], self.main_window,
+                                coordinates=active_profile.get('coordinates'))
         if dialog.exec():
             active_profile['font_settings'] = dialog.get_settings()
             self.save_config()
-            self.overlay_window.update_fonts_from_config()
+            self.overlay_window.invalidate_board(self.config['active_profile_name'])
             self.config_window.update_fonts_from_config()
+            self.state_publisher.mark_dirty()
             print("Настройки оформления обновлены.")
             
+    def open_session_window(self):
+        if self.is_config_mode: return
+        dialog = SessionWindow(list(self.config['profiles'].keys()), self.config['active_profile_name'],
+                               self.config.get("session_profiles", []), self.main_window)
+        if dialog.exec():
+            old_names = {name for name, _ in self.get_session_profiles()}
+            self.config['session_profiles'] = dialog.get_session_profiles()
+            self.save_config()
+            new_names = {name for name, _ in self.get_session_profiles()}
+            for name in old_names ^ new_names:
+                self.overlay_window.invalidate_board(name)
+            self.state_publisher.mark_dirty()
+            print(f"Столов на экране: {len(new_names)}.")
+
     def update_all_ui(self):
         self.update_toggle_action_text()
         self.update_button_states()
         self.update_status_bar()
         self.main_window.update_profile_list(list(self.config['profiles'].keys()), self.config['active_profile_name'])
         self.overlay_window.update_fonts_from_config()
+        self.state_publisher.mark_dirty()
 
     def update_status_bar(self):
         active_profile = self.get_active_profile()
@@ -630,6 +2379,7 @@ class TrayAppController(QObject):
         has_coords = bool(active_profile and active_profile.get("coordinates"))
         self.main_window.toggle_button.setEnabled(has_coords)
         self.main_window.clear_coords_button.setEnabled(has_coords)
+        self.main_window.edit_points_button.setEnabled(has_coords)
         self.toggle_action.setEnabled(has_coords)
         tooltip = "Сначала настройте координаты" if not has_coords else ""
         self.main_window.toggle_button.setToolTip(tooltip)
@@ -645,32 +2395,73 @@ class TrayAppController(QObject):
         self.main_window.update_toggle_button_text(is_visible)
 
     def toggle_overlay_visibility(self):
+        self.set_overlay_visible(not self.overlay_window.isVisible())
+
+    def set_overlay_visible(self, visible):
         if self.is_config_mode: return
         active_profile = self.get_active_profile()
         if not active_profile or not active_profile.get("coordinates"): return
-        self.overlay_window.setVisible(not self.overlay_window.isVisible())
+        if visible == self.overlay_window.isVisible(): return
+        self.overlay_window.setVisible(visible)
+        self.state_publisher.mark_dirty()
         self.update_toggle_action_text()
         print(f"Оверлей {'показан.' if self.overlay_window.isVisible() else 'скрыт.'}")
         self.update_status_bar()
 
     def start_config_mode(self):
         if self.is_config_mode: return
+        self.config_window.edit_mode = False
+        self.config_window.fit_mode = False
+        self._show_config_window()
+        print("\n--- Режим настройки АКТИВИРОВАН ---")
+        self.main_window.statusBar().showMessage("Режим настройки...")
+
+    def start_fit_mode(self):
+        if self.is_config_mode or np is None: return
+        self.config_window.edit_mode = False
+        self.config_window.start_fitting()
+        self._show_config_window()
+        print("\n--- Быстрая калибровка АКТИВИРОВАНА ---")
+        self.main_window.statusBar().showMessage("Быстрая калибровка...")
+
+    def start_edit_mode(self):
+        if self.is_config_mode: return
+        boards = self.get_session_profiles()
+        if not boards: return
+        self.config_window.fit_mode = False
+        self.config_window.update_fonts_from_config()
+        self.config_window.start_editing(boards)
+        self._show_config_window()
+        print(f"\n--- Режим редактирования точек АКТИВИРОВАН (точек: {len(self.config_window.edit_points)}) ---")
+        self.main_window.statusBar().showMessage("Редактирование точек...")
+
+    def _show_config_window(self):
         self.is_config_mode = True
         self.overlay_window.hide()
+        self.state_publisher.mark_dirty()
         self.config_window.new_coords.clear()
+        self.config_window.tracer = InputLatencyTracer() if self.trace_input_path else None
         self.config_window.update_fonts_from_config()
         self.config_window.update()
         self.config_window.show()
         self.config_window.activateWindow()
         self.config_window.raise_()
         self.main_window.hide()
-        print("\n--- Режим настройки АКТИВИРОВАН ---")
-        self.main_window.statusBar().showMessage("Режим настройки...")
 
     def stop_config_mode(self, cancelled=False):
         if not self.is_config_mode: return
         self.is_config_mode = False
         self.config_window.hide()
+        if self.config_window.edit_mode:
+            self.config_window.edit_mode = False
+            self.commit_point_edits()
+        if self.config_window.fit_mode:
+            fit = self.config_window.fit
+            if fit and not cancelled:
+                print(f"Подгонка ({fit['model']}, бар {fit['bar_units']:.2f} шага): ошибка {fit['rms']:.1f} px, "
+                      f"невязки якорей: " + ", ".join(f"{n}: {e:.1f}" for n, e in sorted(fit['residuals'].items())))
+            self.config_window.fit_mode = False
+        self.dump_input_trace()
         self.show_main_window()
         active_profile = self.get_active_profile()
         if self.config.get("show_overlay_on_startup", True) and active_profile and active_profile.get("coordinates"):
@@ -679,6 +2470,16 @@ class TrayAppController(QObject):
         if cancelled: print("Настройка отменена пользователем.")
         print("--- Режим настройки ВЫКЛЮЧЕН ---\n")
 
+    def dump_input_trace(self):
+        tracer = self.config_window.tracer
+        if not tracer: return
+        self.config_window.tracer = None
+        print(tracer.summary())
+        try:
+            tracer.dump(self.trace_input_path)
+            print(f"Трасса ввода сохранена в {self.trace_input_path}.")
+        except IOError as e: print(f"Не удалось сохранить трассу ввода: {e}")
+
     def clear_coordinates(self):
         if self.is_config_mode: return
         active_profile = self.get_active_profile()
@@ -688,7 +2489,8 @@ class TrayAppController(QObject):
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                                      QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
-            active_profile["coordinates"] = []
+            self.set_profile_coordinates(active_profile, [])
+            if self.recorder: self.recorder.record_calibration([])
             self.save_config()
             self.overlay_window.update()
             self.overlay_window.hide()
@@ -699,7 +2501,8 @@ class TrayAppController(QObject):
         active_profile = self.get_active_profile()
         if not active_profile: return
         print(f"Настройка завершена. Получено {len(new_coords)} точек.")
-        active_profile["coordinates"] = new_coords
+        self.set_profile_coordinates(active_profile, new_coords)
+        if self.recorder: self.recorder.record_calibration(new_coords)
         self.save_config()
         self.stop_config_mode()
 
@@ -708,6 +2511,7 @@ class TrayAppController(QObject):
         profile_name = self.main_window.profile_combo.itemText(index)
         if not profile_name or profile_name == self.config['active_profile_name']: return
         self.config['active_profile_name'] = profile_name
+        if self.recorder: self.recorder.record_profile_switch(profile_name)
         print(f"Активен профиль: {profile_name}")
         self.overlay_window.hide()
         if self.config.get("show_overlay_on_startup", True):
@@ -716,6 +2520,13 @@ class TrayAppController(QObject):
                 self.overlay_window.show()
         self.update_all_ui()
 
+    def select_profile_by_name(self, profile_name):
+        index = self.main_window.profile_combo.findText(profile_name)
+        if index < 0:
+            print(f"Профиль '{profile_name}' не найден.")
+            return
+        self.main_window.profile_combo.setCurrentIndex(index)
+
     def add_profile(self):
         text, ok = QInputDialog.getText(self.main_window, 'Новый профиль', 'Введите имя нового профиля:')
         if ok and text:
@@ -724,6 +2535,7 @@ class TrayAppController(QObject):
                 return
             self.config['profiles'][text] = get_default_profile()
             self.config['active_profile_name'] = text
+            if self.recorder: self.recorder.record_profile_switch(text)
             self.save_config()
             self.update_all_ui()
             print(f"Создан и активирован профиль: {text}")
@@ -737,6 +2549,9 @@ class TrayAppController(QObject):
                 return
             self.config['profiles'][text] = self.config['profiles'].pop(old_name)
             self.config['active_profile_name'] = text
+            if self.recorder: self.recorder.record_profile_switch(text)
+            self.config['session_profiles'] = [text if n == old_name else n
+                                               for n in self.config.get('session_profiles', [])]
             self.save_config()
             self.update_all_ui()
             print(f"Профиль '{old_name}' переименован в '{text}'.")
@@ -753,8 +2568,11 @@ class TrayAppController(QObject):
                                      QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             del self.config['profiles'][profile_to_remove]
+            self.config['session_profiles'] = [n for n in self.config.get('session_profiles', [])
+                                               if n != profile_to_remove]
             # Switch to the first available profile
             self.config['active_profile_name'] = next(iter(self.config['profiles']))
+            if self.recorder: self.recorder.record_profile_switch(self.config['active_profile_name'])
             self.save_config()
             self.overlay_window.hide()
             self.update_all_ui()
@@ -765,11 +2583,16 @@ def main():
     warnings.filterwarnings("ignore", category=DeprecationWarning)
     
     app = QApplication(sys.argv)
+    argv = app.arguments()[1:]
+    args, _ = build_arg_parser().parse_known_args(argv)
+    # Второй запуск только передает команду работающему экземпляру
+    if forward_to_running_instance(argv):
+        return 0
     if not QSystemTrayIcon.isSystemTrayAvailable():
         QMessageBox.critical(None, "Ошибка", "Системный трей недоступен. Приложение не может быть запущено.")
         return -1
     
-    controller = TrayAppController(app)
+    controller = TrayAppController(app, args)
     sys.exit(app.exec())
 
 if __name__ == '__main__':
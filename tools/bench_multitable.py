@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк отрисовки OverlayWindow в режиме мультистола: 1, 4, 8 и 16 досок.
+
+    python tools/bench_multitable.py
+    python tools/bench_multitable.py --boards 1 4 8 16 --iterations 50
+
+Доски — копии раскладки профиля Default из config.json, разнесенные сеткой
+по виртуальному рабочему столу из двух мониторов (offscreen-платформа Qt).
+Часть досок нарочно выходит за экраны, чтобы было видно отсечение.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtGui import QImage, QPainter, QFont, QColor, QRegion
+from PyQt6.QtCore import QPoint
+from overlay_app import OverlayWindow, TrayAppController, draw_number
+
+SCREENS = [{"name": "Main", "x": 0, "y": 0, "width": 3840, "height": 2160},
+           {"name": "Side", "x": 3840, "y": 0, "width": 2560, "height": 1440}]
+
+
+class BenchSession:
+    """Конфигурация с N профилями-столами; логику выбора досок берем у контроллера."""
+    get_session_profiles = TrayAppController.get_session_profiles
+
+    def __init__(self, base_profile, boards):
+        min_x = min(x for x, _ in base_profile["coordinates"])
+        min_y = min(y for _, y in base_profile["coordinates"])
+        profiles = {}
+        for index in range(boards):
+            dx, dy = 100 + (index % 4) * 1500, 100 + (index // 4) * 1000
+            profile = json.loads(json.dumps(base_profile))
+            profile["coordinates"] = [[x - min_x + dx, y - min_y + dy] for x, y in profile["coordinates"]]
+            profiles[f"Table {index + 1}"] = profile
+        self.config = {"profiles": profiles, "active_profile_name": "Table 1",
+                       "session_profiles": list(profiles)}
+
+
+def timed(iterations, func):
+    start = time.perf_counter()
+    for _ in range(iterations): func()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--boards", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--iterations", type=int, default=30)
+    args = parser.parse_args()
+
+    screens_file = os.path.join(tempfile.mkdtemp(), "screens.json")
+    with open(screens_file, 'w', encoding='utf-8') as f:
+        json.dump({"screens": [dict(s, logicalDpi=96, logicalBaseDpi=96, dpr=1) for s in SCREENS]}, f)
+    app = QApplication([sys.argv[0], "-platform", f"offscreen:configfile={screens_file}"])
+    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.json")
+    with open(config_path, 'r', encoding='utf-8') as f:
+        base_profile = json.load(f)["profiles"]["Default"]
+
+    print(f"{'досок':>6} {'номеров':>8} {'видимых':>8} {'полный кадр':>12} {'без кэша':>10} "
+          f"{'одна доска':>11} {'пересборка':>11}")
+    for boards in args.boards:
+        session = BenchSession(base_profile, boards)
+        overlay = OverlayWindow(session)
+        target = QImage(overlay.size(), QImage.Format.Format_ARGB32_Premultiplied)
+        visible = sum(len(board.labels) for board in overlay.boards.values())
+
+        full = timed(args.iterations, lambda: overlay.render(target))
+
+        # Прежний способ: путь текста для каждого номера на каждой отрисовке
+        font = QFont("Arial", base_profile["font_settings"]["size"], QFont.Weight.Bold)
+        def uncached():
+            painter = QPainter(target)
+            painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+            for _, profile in session.get_session_profiles():
+                for i, (x, y) in enumerate(profile["coordinates"]):
+                    draw_number(painter, overlay.mapFromGlobal(QPoint(x, y)), str(i + 1), font,
+                                QColor(255, 255, 0), QColor(0, 0, 0), 4)
+            painter.end()
+        without_cache = timed(args.iterations, uncached)
+
+        first = overlay.boards["Table 1"].bounds
+        one_board = timed(args.iterations, lambda: overlay.render(target, QPoint(), QRegion(first)))
+        rebuild = timed(args.iterations, lambda: overlay.invalidate_board("Table 1"))
+        print(f"{boards:>6} {boards * 24:>8} {visible:>8} {full:>9.2f} мс {without_cache:>7.2f} мс "
+              f"{one_board:>8.2f} мс {rebuild:>8.2f} мс")
+        overlay.deleteLater()
+
+
+if __name__ == '__main__':
+    main()
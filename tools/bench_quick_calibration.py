@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Точность и скорость быстрой калибровки относительно ручных раскладок из config.json.
+
+    python tools/bench_quick_calibration.py
+    python tools/bench_quick_calibration.py --config path/to/config.json --noise 3
+    python tools/bench_quick_calibration.py --noise 0 --trials 1
+
+Для каждого профиля с полной раскладкой якоря берутся из ручных координат
+с добавлением шума клика (по умолчанию 1 px), остальные пункты
+восстанавливаются fit_board_layout и сравниваются с ручными. «Сбой» — опыт,
+в котором хотя бы один пункт ушел дальше FAIL_DISTANCE_PX от ручного.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from overlay_app import fit_board_layout, NUMBER_MAPPING
+
+ANCHOR_SETS = [
+    [1, 12, 13, 24],
+    [1, 12, 13, 24, 6, 7],
+    [1, 12, 13, 24, 18, 19],
+    [1, 12, 13, 24, 6, 7, 18, 19],
+    [1, 6, 7, 12, 13, 18, 19, 24, 3, 10, 15, 22],
+]
+FAIL_DISTANCE_PX = 50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.json"))
+    parser.add_argument("--noise", type=float, default=1.0, help="СКО шума клика по якорям, px")
+    parser.add_argument("--trials", type=int, default=40)
+    args = parser.parse_args()
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        profiles = json.load(f)["profiles"]
+    rng = np.random.default_rng(0)
+    for name, profile in profiles.items():
+        manual = np.array(profile.get("coordinates", []), dtype=float)
+        if len(manual) != len(NUMBER_MAPPING): continue
+        print(f"Профиль '{name}':")
+        print(f"  {'якорей':>6} {'модель':>10} {'бар':>5} {'средн.':>8} {'макс.':>8} {'RMS якорей':>11} "
+              f"{'выбросы':>8} {'сбои':>6} {'время':>9}")
+        for anchor_set in ANCHOR_SETS:
+            errors, rms, elapsed, flagged, failed = [], [], 0.0, 0, 0
+            trials = args.trials
+            for _ in range(trials):
+                anchors = {n: manual[n - 1] + rng.normal(0, args.noise, 2) for n in anchor_set}
+                start = time.perf_counter()
+                fit = fit_board_layout(anchors)
+                elapsed += time.perf_counter() - start
+                free = [n - 1 for n in range(1, 25) if n not in anchor_set]
+                errors.append(np.linalg.norm(np.array(fit["points"])[free] - manual[free], axis=1))
+                rms.append(fit["rms"])
+                flagged += bool(fit["outliers"])
+                failed += errors[-1].max() > FAIL_DISTANCE_PX
+            errors = np.concatenate(errors)
+            print(f"  {len(anchor_set):>6} {fit['model']:>10} {fit['bar_units']:>5.2f} {errors.mean():>5.1f} px "
+                  f"{errors.max():>5.1f} px {np.mean(rms):>8.1f} px {flagged:>8} {failed:>3}/{trials:<2} "
+                  f"{elapsed / trials * 1000:>6.2f} мс")
+
+
+if __name__ == '__main__':
+    main()
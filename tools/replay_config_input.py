@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Воспроизводит запись мыши в ConfigOverlay и меряет задержку «ввод -> отрисовка».
+
+    python tools/replay_config_input.py                          # сценарий на 24 клика
+    python tools/replay_config_input.py --input trace.json --speed 0 --trace out.json
+
+Запускается на offscreen-платформе Qt, поэтому результаты воспроизводимы
+и не зависят от реального монитора.
+"""
+import os
+import sys
+import argparse
+import contextlib
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt6.QtWidgets import QApplication
+from overlay_app import (ConfigOverlay, InputLatencyTracer, InputReplayer, load_input_recording,
+                         get_default_profile)
+
+
+class ProfileSource:
+    """Минимальный источник профиля для ConfigOverlay вне TrayAppController."""
+    def __init__(self, profile):
+        self.profile = profile
+
+    def get_active_profile(self):
+        return self.profile
+
+
+def scripted_recording(width, height, moves_per_point=12, interval_ms=8):
+    """Расстановка 24 точек по двум рядам: плавное движение мыши и клик, плюс пара отмен."""
+    recording, t = [], 0.0
+    x, y = width // 2, height // 2
+    targets = [(int(width * (0.1 + 0.8 * (i % 12) / 11)), int(height * (0.15 if i < 12 else 0.85)))
+               for i in range(24)]
+    for index, (tx, ty) in enumerate(targets):
+        for step in range(1, moves_per_point + 1):
+            t += interval_ms
+            recording.append({"t": t, "type": "move",
+                              "x": x + (tx - x) * step // moves_per_point,
+                              "y": y + (ty - y) * step // moves_per_point})
+        x, y = tx, ty
+        t += interval_ms
+        recording.append({"t": t, "type": "press", "x": x, "y": y, "button": "left"})
+        if index in (5, 17):
+            t += interval_ms
+            recording.append({"t": t, "type": "press", "x": x, "y": y, "button": "right"})
+            t += interval_ms
+            recording.append({"t": t, "type": "press", "x": x, "y": y, "button": "left"})
+    return recording
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="запись (список событий или Chrome trace из --trace-input)")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 — реальный темп, 0 — максимальная скорость")
+    parser.add_argument("--size", default="3840x1080", help="размер рабочего стола, например 5760x2160")
+    parser.add_argument("--trace", help="сохранить Chrome trace воспроизведения")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    overlay = ConfigOverlay(ProfileSource(get_default_profile()))
+    overlay.setGeometry(0, 0, width, height)
+    overlay.show()
+    app.processEvents()
+
+    recording = load_input_recording(args.input) if args.input else scripted_recording(width, height)
+    overlay.tracer = InputLatencyTracer()
+    replayer = InputReplayer(overlay, recording, speed=args.speed)
+    replayer.finished.connect(lambda: QApplication.instance().quit())
+    replayer.start()
+    # Лог расстановки точек здесь не нужен
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        app.exec()
+        app.processEvents()
+
+    print(f"Рабочий стол {width}x{height}, событий: {len(recording)}, скорость: "
+          f"{'максимальная' if args.speed <= 0 else f'{args.speed:g}x'}")
+    print(overlay.tracer.summary())
+    if args.trace:
+        overlay.tracer.dump(args.trace)
+        print(f"Трасса сохранена в {args.trace}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Воспроизведение записи сессии (session.rec) на отдельном окне оверлея.
+
+    python tools/replay_session.py --input session.rec
+    python tools/replay_session.py --input session.rec --speed 0
+    python tools/replay_session.py --synthesize 5000 --speed 0
+
+Окно строится над копией config.json, рабочая конфигурация не меняется.
+--speed 1 повторяет исходный темп, --speed 0 применяет события без пауз
+(проверка пропускной способности). --synthesize N сначала пишет
+синтетическую запись из N событий во временный файл.
+"""
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QObject, QEvent
+from overlay_app import (OverlayWindow, TrayAppController, SessionRecorder, SessionReplayer,
+                         read_session_records)
+
+
+class ReplaySession:
+    """Копия конфигурации, к которой применяются события записи."""
+    get_session_profiles = TrayAppController.get_session_profiles
+
+    def __init__(self, config):
+        self.config = config
+
+
+class PaintCounter(QObject):
+    """Считает события отрисовки окна оверлея."""
+    def __init__(self):
+        super().__init__()
+        self.frames = 0
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            self.frames += 1
+        return False
+
+
+def synthesize(path, config, count):
+    """Пишет запись из count случайных событий по профилям конфигурации."""
+    rng = random.Random(1)
+    profiles = list(config["profiles"])
+    recorder = SessionRecorder(path, capacity=count + 1)
+    for _ in range(count):
+        kind = rng.random()
+        name = rng.choice(profiles)
+        if kind < 0.5:
+            x, y = config["profiles"][name]["coordinates"][rng.randrange(24)]
+            recorder.record_point_edit(name, rng.randrange(24), x + rng.randint(-3, 3), y + rng.randint(-3, 3))
+        elif kind < 0.7:
+            recorder.record_board_state([rng.randint(-5, 5) for _ in range(24)])
+        elif kind < 0.9:
+            recorder.record_annotations([{"point": rng.randrange(1, 25), "text": "!", "color": [255, 0, 0]}],
+                                        rng.random() < 0.5)
+        else:
+            recorder.record_profile_switch(name)
+    recorder.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default="session.rec")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.json"))
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--synthesize", type=int, default=0, metavar="N")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv[:1])
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    path = args.input
+    if args.synthesize:
+        path = os.path.join(tempfile.mkdtemp(), "session.rec")
+        synthesize(path, config, args.synthesize)
+    records = read_session_records(path)
+    if not records:
+        print(f"В {path} нет записей.")
+        return
+    print(f"Записей: {len(records)}, длительность {records[-1]['t'] - records[0]['t']:.1f} с")
+
+    overlay = OverlayWindow(ReplaySession(config))
+    counter = PaintCounter()
+    overlay.installEventFilter(counter)
+    overlay.show()
+    replayer = SessionReplayer(overlay, records, args.speed)
+    boards = []
+    replayer.board_state.connect(boards.append)
+    replayer.finished.connect(app.quit)
+    start = time.perf_counter()
+    replayer.start()
+    app.exec()
+    elapsed = time.perf_counter() - start
+    print(f"Применено событий: {replayer.applied} за {elapsed:.2f} с "
+          f"({replayer.applied / max(elapsed, 1e-9):.0f} событий/с), кадров: {counter.frames}, "
+          f"состояний доски: {len(boards)}")
+
+
+if __name__ == '__main__':
+    main()
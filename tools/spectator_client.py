@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Локальный зритель трансляции NardiLens и бенчмарк пропускной способности.
+
+    python tools/spectator_client.py --port 47024          # следить за оверлеем
+    python tools/spectator_client.py --bench               # замерить публикацию
+    python tools/spectator_client.py --bench --slow        # зритель не успевает читать
+
+В режиме --slow у зрителя маленький приемный буфер и он читает с паузами,
+а у сервера уменьшен буфер отправки, поэтому очередь публикации упирается
+в SPECTATOR_MAX_QUEUED_BYTES и промежуточные состояния пропускаются.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from overlay_app import apply_state_delta, SPECTATOR_MAX_QUEUED_BYTES
+
+SLOW_BUFFER_BYTES = 4096
+SLOW_READ_PAUSE_S = 0.005
+
+
+def read_messages(sock):
+    """Читает построчные JSON-сообщения из сокета до его закрытия."""
+    buffer = b""
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk: return
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip(): yield json.loads(line.decode('utf-8'))
+
+
+def follow(host, port):
+    """Подключается к трансляции и печатает каждое изменение состояния."""
+    state = {}
+    with socket.create_connection((host, port)) as sock:
+        sock.sendall(b'{"subscribe": true}\n')
+        for message in read_messages(sock):
+            if message["type"] == "snapshot":
+                state = message["state"]
+                print(f"[v{message['version']}] снимок: профиль '{state['profile']}', "
+                      f"{len(state['coordinates'])} точек, оверлей {'виден' if state['visible'] else 'скрыт'}")
+            else:
+                apply_state_delta(state, message["changes"])
+                print(f"[v{message['version']}] изменено: {', '.join(message['changes'])}")
+
+
+def bench(updates, slow_reader):
+    """Публикует `updates` состояний и меряет, сколько дошло до зрителя и за какое время."""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtCore import QCoreApplication
+    from PyQt6.QtNetwork import QAbstractSocket
+    from overlay_app import StatePublisher
+
+    app = QCoreApplication(sys.argv)
+    base = json.load(open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "config.json"),
+                          encoding='utf-8'))["profiles"]["Default"]
+    state = {"profile": "Default", "visible": True, "coordinates": base["coordinates"],
+             "font_settings": base["font_settings"], "annotations": {}}
+    publisher = StatePublisher(lambda: state)
+    publisher.listen("127.0.0.1", 0)
+    port = publisher.server.serverPort()
+
+    received = {"messages": 0, "bytes": 0, "last_version": 0, "state": {}}
+    def reader():
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            if slow_reader: sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SLOW_BUFFER_BYTES)
+            sock.connect(("127.0.0.1", port))
+            sock.sendall(b'{"subscribe": true}\n')
+            buffer = b""
+            while True:
+                chunk = sock.recv(1024 if slow_reader else 65536)
+                if not chunk: return
+                received["bytes"] += len(chunk)
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    message = json.loads(line)
+                    received["messages"] += 1
+                    received["last_version"] = message["version"]
+                    if message["type"] == "snapshot": received["state"] = message["state"]
+                    else: apply_state_delta(received["state"], message["changes"])
+                if slow_reader: time.sleep(SLOW_READ_PAUSE_S)
+    threading.Thread(target=reader, daemon=True).start()
+    while not publisher.clients or next(iter(publisher.clients.values())).last_state is None:
+        app.processEvents()
+    if slow_reader:
+        for client in publisher.clients.values():
+            client.socket.setSocketOption(QAbstractSocket.SocketOption.SendBufferSizeSocketOption,
+                                          SLOW_BUFFER_BYTES)
+
+    snapshot_size = len(json.dumps(state, separators=(",", ":")))
+    start = time.perf_counter()
+    max_queued = 0
+    for i in range(1, updates + 1):
+        state = dict(state, annotations={str(i % 24 + 1): {"text": str(i % 100)}})
+        publisher.publish()
+        app.processEvents()
+        max_queued = max(max_queued, max(c.socket.bytesToWrite() for c in publisher.clients.values()))
+    elapsed = time.perf_counter() - start
+    deadline = time.time() + 60
+    while received["last_version"] < publisher.version and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+
+    print(f"Обновлений опубликовано: {updates} за {elapsed * 1000:.1f} мс "
+          f"({updates / elapsed:.0f} в секунду)")
+    print(f"Сообщений получено зрителем: {received['messages']}, байт: {received['bytes']} "
+          f"(полные снимки заняли бы ~{snapshot_size * updates} байт)")
+    print(f"Версий: {publisher.version}, пропущено промежуточных: "
+          f"{max(0, publisher.version + 1 - received['messages'])}")
+    print(f"Макс. очередь отправки: {max_queued} байт (лимит {SPECTATOR_MAX_QUEUED_BYTES}, "
+          f"{'соблюден' if max_queued <= SPECTATOR_MAX_QUEUED_BYTES else 'превышен'}); "
+          f"итоговое состояние совпадает: {received['state'] == state}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=47024)
+    parser.add_argument("--bench", action="store_true", help="запустить бенчмарк публикации")
+    parser.add_argument("--updates", type=int, default=10000)
+    parser.add_argument("--slow", action="store_true", help="медленный зритель (проверка backpressure)")
+    args = parser.parse_args()
+    if args.bench: bench(args.updates, args.slow)
+    else: follow(args.host, args.port)
+
+
+if __name__ == '__main__':
+    main()